@@ -9,8 +9,73 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+
+from core import (
+    asyncviews,
+    startup,
+)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """ASGI handler serving hot read endpoints by async views."""
+
+    def create_request(self, scope, body_file):
+        """Create request resolved by the URLconf with async views."""
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = settings.ASYNC_ROOT_URLCONF
+
+        return request, error_response
+
+    async def send_response(self, response, send):
+        """Send response, streamed content is generated in a thread."""
+        # Django 3.2 iterates streamed content in the event loop, where
+        # ORM raises SynchronousOnlyOperation
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self._get_headers(response),
+        })
+        parts = asyncviews.iterate_in_thread(response, close=response.close)
+        async for part in parts:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        # streaming thread is finished already, request_finished closes
+        # connections of the thread which ran the view too
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    def _get_headers(self, response):
+        """Return ASGI headers of response, like the parent handler."""
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip(),
+            ))
+
+        return headers
+
+
+# same as get_asgi_application, with own handler
+django.setup(set_prefix=False)
+application = AsyncViewsASGIHandler()
+
+# loaded in every uvicorn worker before it accepts requests
+startup.preload(settings.ASYNC_ROOT_URLCONF)
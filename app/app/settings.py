@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -64,6 +65,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'app.urls'
+# URLconf of requests served through ASGI (app.asgi)
+ASYNC_ROOT_URLCONF = 'app.urls_async'
 
 TEMPLATES = [
     {
@@ -86,16 +89,91 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# postgresql backend with connection health checks and optional pool
+# shared by threads of a worker (see core.backends.postgresql)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # seconds to keep connection open between requests, so requests
+        # do not pay for TCP handshake and authentication. 0 closes it
+        # at the end of each request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # check reused connection before the first query of request
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # connections shared by threads of a process, 0 disables the pool.
+        # Pooled connections are returned at the end of request when
+        # DB_CONN_MAX_AGE is 0
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
 }
 
+# read replicas of the default database - comma separated hosts with the
+# same credentials. Safe requests of recipe APIs read from them
+# (see core.routers)
+REPLICA_DATABASES = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        # tests read the test database through replica aliases
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# cache of users pinned to primary, must be shared by all workers
+# (see core.checks)
+REPLICA_CACHE_ALIAS = 'default'
+# seconds user reads from primary after a write, to see own changes.
+# Must be longer than REPLICA_MAX_LAG
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# replicas lagging more seconds behind primary are not read from
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 1))
+REPLICA_LAG_CHECK_INTERVAL = 1
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# local memory cache by default. In production point it to shared cache
+# (memcached, see docker-compose-deploy.yml), so all workers see the same
+# data
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+# backends not shared by worker processes - invalidation done by one worker
+# is not seen by the others. Features relying on it are off with them
+PROCESS_LOCAL_CACHE_BACKENDS = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+CACHE_IS_SHARED = (
+    CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+)
+
+# cache of list responses of recipe APIs, requires shared cache
+# (see core.checks)
+RECIPE_CACHE = bool(
+    int(os.environ.get('RECIPE_CACHE', int(CACHE_IS_SHARED)))
+)
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,7 +215,68 @@ STATIC_URL = '/static/static/'
 MEDIA_URL = '/static/media/'
 
 MEDIA_ROOT = '/vol/web/media'
-STATIC_ROOT = '/vol/web/static'
+# overridden when static files are collected at image build
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/vol/web/static')
+
+# uploaded files are named by hash of their content and deduplicated,
+# unreferenced files are removed by gc_files command after grace period
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+STORAGE_GC_GRACE_PERIOD = int(
+    os.environ.get('STORAGE_GC_GRACE_PERIOD', 60 * 60)
+)
+
+# limits of uploaded recipe images. Size matches client_max_body_size
+# of the proxy, pixels limit rejects decompression bombs
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40 * 1000 * 1000)
+)
+
+# resized variants of recipe images are generated by pool of worker
+# threads after upload. Format is WEBP when Pillow supports it, else JPEG
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+IMAGE_VARIANT_FORMAT = os.environ.get('IMAGE_VARIANT_FORMAT', '')
+# generate variants in request thread - for tests and debugging
+IMAGE_VARIANTS_SYNC = bool(int(os.environ.get('IMAGE_VARIANTS_SYNC', 0)))
+# pool is in process memory - variants queued when the worker is recycled
+# are lost. process_image_jobs command regenerates variants missing longer
+# than the grace period every sweep interval (0 disables it)
+IMAGE_VARIANT_GRACE_PERIOD = int(
+    os.environ.get('IMAGE_VARIANT_GRACE_PERIOD', 10 * 60)
+)
+IMAGE_VARIANT_SWEEP_INTERVAL = int(
+    os.environ.get('IMAGE_VARIANT_SWEEP_INTERVAL', 10 * 60)
+)
+
+# uploads with ?async=true are processed by process_image_jobs command.
+# Jobs running longer than timeout are considered crashed and retried
+IMAGE_JOB_POLL_INTERVAL = float(os.environ.get('IMAGE_JOB_POLL_INTERVAL', 1))
+IMAGE_JOB_TIMEOUT = int(os.environ.get('IMAGE_JOB_TIMEOUT', 10 * 60))
+IMAGE_JOB_MAX_ATTEMPTS = 3
+
+# text search configuration of recipe search vectors - changing it requires
+# recomputing stored vectors
+RECIPE_SEARCH_CONFIG = 'english'
+# only this many newest matching recipes are ranked, 0 ranks all matches.
+# Bounds ranking cost of common words, but older matches are then never
+# returned, not even on later pages
+RECIPE_SEARCH_MAX_CANDIDATES = int(
+    os.environ.get('RECIPE_SEARCH_MAX_CANDIDATES', 0)
+)
+
+# autocomplete of tag/ingredient names (?q=). Results of hot prefixes are
+# cached in process per user, until the generation of the user's recipe
+# data changes. Requires shared cache - the generation must be bumped in
+# all workers (see core.checks)
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_CACHE = bool(
+    int(os.environ.get('AUTOCOMPLETE_CACHE', int(CACHE_IS_SHARED)))
+)
+AUTOCOMPLETE_CACHE_TTL = int(os.environ.get('AUTOCOMPLETE_CACHE_TTL', 60))
+AUTOCOMPLETE_CACHE_SIZE = 10000
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -153,6 +292,55 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# cache token -> user lookups of CachedTokenAuthentication used by all
+# API views. Disable to query the token table on every request. Requires
+# shared cache - deleted tokens must be rejected by all workers
+# (see core.checks)
+AUTH_TOKEN_CACHE = bool(
+    int(os.environ.get('AUTH_TOKEN_CACHE', int(CACHE_IS_SHARED)))
+)
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 300))
+# in process tier is not invalidated across workers - keep TTL short
+AUTH_TOKEN_CACHE_LOCAL_TTL = int(
+    os.environ.get('AUTH_TOKEN_CACHE_LOCAL_TTL', 30)
+)
+AUTH_TOKEN_CACHE_LOCAL_SIZE = 10000
+# log hit ratio of the token cache every number of lookups, 0 disables
+AUTH_TOKEN_CACHE_STATS_INTERVAL = int(
+    os.environ.get('AUTH_TOKEN_CACHE_STATS_INTERVAL', 10000)
+)
+
+# app loggers (core, recipe) write to console, collected by docker
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        name: {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        }
+        for name in ['core', 'recipe']
+    },
+}
+
+# default and maximum number of items in a page of list endpoints.
+# pagination is enabled only when client sends cursor or page_size param
+PAGINATION_PAGE_SIZE = int(os.environ.get('PAGINATION_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(
+    os.environ.get('PAGINATION_MAX_PAGE_SIZE', 200)
+)
+
+# build recipe, tag and ingredient lists from values() rows instead of
+# model serializers, rendered by orjson when it is installed. Responses
+# are byte-identical to the serializers (see benchmark_serialization)
+RECIPE_FAST_SERIALIZATION = bool(
+    int(os.environ.get('RECIPE_FAST_SERIALIZATION', 0))
+)
+
 # this allows for uploading an image through browsable swagger interface
 # use multipart/form-data in swagger when uploading an image!!!
 SPECTACULAR_SETTINGS = {
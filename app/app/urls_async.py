@@ -0,0 +1,22 @@
+"""
+URL configuration of requests served through ASGI (see app.asgi).
+
+Same URLs as app.urls, the hot read endpoints are served by async views.
+"""
+from core import (
+    asyncviews,
+    views as core_views,
+)
+from app import urls
+
+
+# async version of view by URL name, created from the sync view
+ASYNC_VIEWS = {
+    'health-check': lambda view: core_views.health_check_async,
+    'recipe-list': asyncviews.as_async,
+    'recipe-detail': asyncviews.as_async,
+    'tag-list': asyncviews.as_async,
+    'ingredient-list': asyncviews.as_async,
+}
+
+urlpatterns = asyncviews.with_async_views(urls.urlpatterns, ASYNC_VIEWS)
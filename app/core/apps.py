@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # connect signal handlers, register system checks
+        from core import (  # noqa: F401
+            checks,
+            signals,
+        )
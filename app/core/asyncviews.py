@@ -0,0 +1,117 @@
+"""
+Async versions of sync views, for requests served through ASGI.
+
+Django 3.2 ORM is synchronous. Async views run the sync view in a pool of
+threads, so the event loop keeps accepting requests while queries wait,
+instead of queuing them behind the single thread Django uses by default.
+"""
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import (
+    close_old_connections,
+    connections,
+)
+from django.urls import (
+    URLPattern,
+    URLResolver,
+)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# parts of streamed response generated by one switch to its thread
+STREAM_BATCH_SIZE = 100
+
+
+def _run_view(view, request, *args, **kwargs):
+    """Run sync view in worker thread, return rendered response."""
+    # request_started/finished signals close database connections of the
+    # thread of the handler, not of this one
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            # render in this thread, not in the one of the handler
+            response = response.render()
+    finally:
+        close_old_connections()
+
+    return response
+
+
+def as_async(view):
+    """Return async view running sync view in a thread pool."""
+    run = functools.partial(_run_view, view)
+    run_parallel = sync_to_async(run, thread_sensitive=False)
+    run_serial = sync_to_async(run, thread_sensitive=True)
+
+    # keeps attributes of the view - csrf_exempt, DRF viewset actions...
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            # reads run concurrently, each in own thread and connection
+            return await run_parallel(request, *args, **kwargs)
+        # writes keep Django default - one thread shared by the requests
+        return await run_serial(request, *args, **kwargs)
+
+    return async_view
+
+
+def with_async_views(patterns, async_views):
+    """Return URL patterns with views replaced by async ones, by name."""
+    result = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern,
+                with_async_views(pattern.url_patterns, async_views),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        elif pattern.name in async_views:
+            pattern = URLPattern(
+                pattern.pattern,
+                async_views[pattern.name](pattern.callback),
+                pattern.default_args,
+                pattern.name,
+            )
+        result.append(pattern)
+
+    return result
+
+
+def _finish_stream(close):
+    """Close streamed response and connections of its thread."""
+    try:
+        close()
+    finally:
+        connections.close_all()
+
+
+async def iterate_in_thread(iterable, close):
+    """Yield items of sync iterable, advanced in a thread of its own."""
+    # iterable may read database through server-side cursor (recipe
+    # export) - it must not run in event loop and must stay in one thread,
+    # whose connection holds the cursor
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    iterator = iter(iterable)
+
+    def next_batch():
+        return list(itertools.islice(iterator, STREAM_BATCH_SIZE))
+
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, next_batch)
+            if not batch:
+                break
+            for item in batch:
+                yield item
+    finally:
+        # generator is closed in the thread it was running in
+        await loop.run_in_executor(executor, _finish_stream, close)
+        executor.shutdown(wait=False)
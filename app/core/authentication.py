@@ -0,0 +1,169 @@
+"""
+Authentication for the APIs.
+"""
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import (
+    router,
+    transaction,
+)
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.localcache import LocalCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Stats:
+    """Thread safe counters of token cache lookups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters."""
+        with self._lock:
+            self.local_hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+
+    def incr(self, counter):
+        """Increment counter by one, log counters every interval."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            total = self.local_hits + self.shared_hits + self.misses
+        interval = settings.AUTH_TOKEN_CACHE_STATS_INTERVAL
+        if interval and total % interval == 0:
+            logger.info(
+                'Token cache: %(local_hits)d local hits, %(shared_hits)d '
+                'shared hits, %(misses)d misses, hit ratio %(hit_ratio).2f',
+                self.as_dict(),
+            )
+
+    def as_dict(self):
+        """Return counters together with hit ratio."""
+        with self._lock:
+            total = self.local_hits + self.shared_hits + self.misses
+            hits = self.local_hits + self.shared_hits
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / total if total else 0.0,
+            }
+
+
+stats = _Stats()
+_local_cache = LocalCache()
+
+
+def _cache_key(key):
+    """Return cache key of token - raw token is never used as a key."""
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Remove token from auth cache, again after commit of write."""
+    _delete_token(key)
+    if transaction.get_connection().in_atomic_block:
+        # until the write is committed, concurrent requests read old rows
+        # and may cache them again
+        transaction.on_commit(lambda: _delete_token(key))
+
+
+def _delete_token(key):
+    """Remove token from both cache tiers."""
+    cache_key = _cache_key(key)
+    _local_cache.delete(cache_key)
+    caches[settings.AUTH_TOKEN_CACHE_ALIAS].delete(cache_key)
+
+
+def clear_local_cache():
+    """Remove all tokens cached in this process."""
+    _local_cache.clear()
+
+
+def _user_fields():
+    """Return names of cached user fields - all but password hash."""
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def _dump_token(token):
+    """Return cacheable data of token and its user."""
+    user = token.user
+    return {
+        'created': token.created,
+        'user': [getattr(user, name) for name in _user_fields()],
+    }
+
+
+def _load_token(key, data):
+    """Return token and user instances built from cached data."""
+    # password stays deferred - loaded from database only when accessed,
+    # and save() of the user does not overwrite it
+    user_model = get_user_model()
+    user = user_model.from_db(
+        router.db_for_read(user_model), _user_fields(), data['user'],
+    )
+    token = Token.from_db(
+        router.db_for_read(Token),
+        ['key', 'user_id', 'created'],
+        [key, user.pk, data['created']],
+    )
+    token.user = user
+
+    return token
+
+
+# tokens are cached in process memory for a short time and in the shared
+# cache for longer. Deleted tokens and changed users are removed from the
+# shared cache and from the local cache of the current process by signal
+# handlers (core.signals), local caches of other processes expire after
+# AUTH_TOKEN_CACHE_LOCAL_TTL seconds.
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication with cached token lookups."""
+
+    def authenticate_credentials(self, key):
+        """Return user and token for key, cached when enabled."""
+        if not settings.AUTH_TOKEN_CACHE:
+            return super().authenticate_credentials(key)
+
+        cache_key = _cache_key(key)
+        # field values are cached, so every request gets its own user
+        # instance
+        data = _local_cache.get(cache_key)
+        if data is not None:
+            stats.incr('local_hits')
+        else:
+            data = caches[settings.AUTH_TOKEN_CACHE_ALIAS].get(cache_key)
+            if data is not None:
+                stats.incr('shared_hits')
+            else:
+                stats.incr('misses')
+                # raises AuthenticationFailed for invalid/inactive users -
+                # failures are not cached
+                user, token = super().authenticate_credentials(key)
+                data = _dump_token(token)
+                caches[settings.AUTH_TOKEN_CACHE_ALIAS].set(
+                    cache_key, data, timeout=settings.AUTH_TOKEN_CACHE_TTL,
+                )
+            _local_cache.set(
+                cache_key,
+                data,
+                ttl=settings.AUTH_TOKEN_CACHE_LOCAL_TTL,
+                max_size=settings.AUTH_TOKEN_CACHE_LOCAL_SIZE,
+            )
+
+        token = _load_token(key, data)
+        return (token.user, token)
@@ -0,0 +1,95 @@
+"""
+PostgreSQL backend with connection health checks and optional pool.
+
+Settings of database (besides the Django ones):
+
+- CONN_HEALTH_CHECKS - check reused connection works before its first
+  query in a request, replace it otherwise.
+- POOL_SIZE - share up to POOL_SIZE connections between threads of a
+  process, 0 disables the pool. Use with CONN_MAX_AGE = 0, so
+  connections are returned to the pool at the end of each request.
+- POOL_TIMEOUT - seconds to wait for a free pooled connection.
+"""
+from django.db.backends.postgresql import base
+
+from core.backends.postgresql import pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL database wrapper with health checks and pooling."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False,
+        )
+        self.health_check_done = False
+
+    def _get_pool(self):
+        """Return connection pool, None when pooling is disabled."""
+        size = self.settings_dict.get('POOL_SIZE', 0)
+        if not size:
+            return None
+        # test databases are created with other names - key by params
+        key = (self.alias, repr(sorted(self.get_connection_params().items())))
+        return pool.get_pool(
+            key, size, self.settings_dict.get('POOL_TIMEOUT', 10),
+        )
+
+    def get_new_connection(self, conn_params):
+        """Open connection, or take one from the pool."""
+        connection_pool = self._get_pool()
+        if connection_pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection, reused = connection_pool.get(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params,
+            ),
+            check=pool.is_usable if self.health_check_enabled else None,
+        )
+        if reused:
+            # set by get_new_connection of new connections
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level,
+            )
+
+        return connection
+
+    def connect(self):
+        """Connect to the database, new connection needs no check."""
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        """Close connection, or return it to the pool."""
+        connection_pool = self._get_pool()
+        if connection_pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # wrapper keeps the connection until rollback, it must not
+                # be handed to other threads meanwhile
+                self.connection.close()
+            connection_pool.put(self.connection)
+
+    def close_if_health_check_failed(self):
+        """Close reused connection if it does not work anymore."""
+        if (self.connection is None or not self.health_check_enabled or
+                self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        """Close connection at request boundary, check it on next use."""
+        super().close_if_unusable_or_obsolete()
+        # connection may have been closed by the server between requests
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        """Return cursor, replace broken connection first."""
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
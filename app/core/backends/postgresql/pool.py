@@ -0,0 +1,99 @@
+"""
+Connection pool shared by threads of a process.
+"""
+import os
+import threading
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def is_usable(connection):
+    """Return whether raw connection can run queries."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except Exception:
+        return False
+
+    return True
+
+
+class ConnectionPool:
+    """Thread safe pool of open database connections."""
+
+    def __init__(self, max_size, timeout):
+        self.timeout = timeout
+        # slots are held by connections checked out of the pool
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self, connect, check=None):
+        """Return idle connection or a new one, wait for a free slot."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Connection pool exhausted, waited {self.timeout} s.'
+            )
+        try:
+            while True:
+                with self._lock:
+                    # most recently used connection is the least likely
+                    # to be closed by the server
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return connect(), False
+                if check is None or check(connection):
+                    return connection, True
+                connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection):
+        """Return connection to the pool, drop it when it is broken."""
+        try:
+            if (not connection.closed and connection.info.transaction_status
+                    != TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+        except Exception:
+            connection.close()
+        if not connection.closed:
+            with self._lock:
+                self._idle.append(connection)
+        self._slots.release()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def get_pool(key, max_size, timeout):
+    """Return pool of process for key, create it if needed."""
+    # pools are not shared with forked processes - uWSGI workers fork
+    # from the master, connections must not be used by both
+    key = (os.getpid(), key)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(max_size, timeout)
+
+    return pool
+
+
+def close_pools():
+    """Close idle connections of all pools and forget them."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,134 @@
+"""
+Helpers for database performance benchmarks.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+BENCHMARK_EMAIL = 'benchmark@example.com'
+# vocabulary of seeded titles and descriptions, words are picked with
+# skewed frequencies, so searches cover both common and rare terms
+WORDS = [
+    'chicken', 'tomato', 'rice', 'pasta', 'salad', 'soup', 'beef', 'curry',
+    'garlic', 'lemon', 'spicy', 'roasted', 'grilled', 'creamy', 'baked',
+    'mushroom', 'spinach', 'coconut', 'ginger', 'honey', 'pumpkin',
+    'lentil', 'salmon', 'avocado', 'chocolate', 'cinnamon', 'quinoa',
+    'fennel', 'saffron', 'tamarind',
+]
+
+
+def random_text(rand, words):
+    """Return text of random vocabulary words."""
+    # weights 1/n - first words are far more common than the last ones
+    return ' '.join(rand.choices(
+        WORDS, weights=[1 / n for n in range(1, len(WORDS) + 1)], k=words,
+    ))
+
+
+def get_benchmark_user():
+    """Return user owning benchmark data, create it if needed."""
+    user = get_user_model().objects.filter(email=BENCHMARK_EMAIL).first()
+    if user is None:
+        user = get_user_model().objects.create_user(BENCHMARK_EMAIL)
+
+    return user
+
+
+def delete_benchmark_user():
+    """Remove benchmark user together with all seeded data."""
+    get_user_model().objects.filter(email=BENCHMARK_EMAIL).delete()
+
+
+def _bulk_create_attrs(model, user, count):
+    """Create count tags/ingredients for user and return their ids."""
+    model.objects.bulk_create(
+        [model(user=user, name=f'{model.__name__} {i}')
+         for i in range(count)],
+        batch_size=1000,
+    )
+    return list(
+        model.objects.filter(user=user).values_list('id', flat=True)
+    )
+
+
+def seed_recipes(user, recipes, tags=50, ingredients=200,
+                 tags_per_recipe=3, ingredients_per_recipe=5,
+                 batch_size=10000, log=None):
+    """Seed recipes with random tags and ingredients for user."""
+    # data is reused between runs - seed only what is missing
+    existing = Recipe.objects.filter(user=user).count()
+    if existing >= recipes:
+        return
+
+    tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+    if not tag_ids:
+        tag_ids = _bulk_create_attrs(Tag, user, tags)
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)
+    )
+    if not ingredient_ids:
+        ingredient_ids = _bulk_create_attrs(Ingredient, user, ingredients)
+
+    # fixed seed keeps datasets comparable between runs
+    rand = random.Random(recipes)
+    RecipeTag = Recipe.tags.through
+    RecipeIngredient = Recipe.ingredients.through
+    for start in range(existing, recipes, batch_size):
+        size = min(batch_size, recipes - start)
+        with transaction.atomic():
+            objs = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=f'{random_text(rand, 3)} {start + i}',
+                    description=random_text(rand, 12),
+                    time_minutes=rand.randint(5, 180),
+                    price=Decimal(rand.randint(100, 9999)) / 100,
+                ) for i in range(size)
+            ])
+            RecipeTag.objects.bulk_create([
+                RecipeTag(recipe_id=obj.id, tag_id=tag_id)
+                for obj in objs
+                for tag_id in rand.sample(tag_ids, tags_per_recipe)
+            ])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe_id=obj.id, ingredient_id=ing_id)
+                for obj in objs
+                for ing_id in rand.sample(
+                    ingredient_ids, ingredients_per_recipe
+                )
+            ])
+        if log:
+            log(f'Seeded {start + size}/{recipes} recipes')
+
+
+def time_callable(func, repeat):
+    """Call func repeat times and return timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def format_timings(label, timings):
+    """Return one line summary of timings."""
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f'{label}: min {ordered[0]:.2f} ms, '
+        f'p50 {statistics.median(ordered):.2f} ms, '
+        f'p99 {p99:.2f} ms'
+    )
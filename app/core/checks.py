@@ -0,0 +1,84 @@
+"""
+System checks of the app configuration.
+"""
+from django.conf import settings
+from django.core.checks import (
+    Error,
+    register,
+)
+
+
+def is_shared_cache(alias):
+    """Return whether cache is shared by all worker processes."""
+    return (
+        settings.CACHES[alias]['BACKEND']
+        not in settings.PROCESS_LOCAL_CACHE_BACKENDS
+    )
+
+
+@register()
+def check_recipe_cache(app_configs, **kwargs):
+    """Refuse list caching with cache not shared by workers."""
+    if settings.RECIPE_CACHE and not is_shared_cache(
+        settings.RECIPE_CACHE_ALIAS
+    ):
+        return [Error(
+            'RECIPE_CACHE requires a cache shared by all workers.',
+            hint='Set CACHE_BACKEND to a shared cache or RECIPE_CACHE=0. '
+                 'Writes handled by one worker would not invalidate lists '
+                 'cached by the others.',
+            id='core.E001',
+        )]
+
+    return []
+
+
+@register()
+def check_auth_token_cache(app_configs, **kwargs):
+    """Refuse token caching with cache not shared by workers."""
+    if settings.AUTH_TOKEN_CACHE and not is_shared_cache(
+        settings.AUTH_TOKEN_CACHE_ALIAS
+    ):
+        return [Error(
+            'AUTH_TOKEN_CACHE requires a cache shared by all workers.',
+            hint='Set CACHE_BACKEND to a shared cache or '
+                 'AUTH_TOKEN_CACHE=0. Tokens deleted in one worker would '
+                 'stay valid in the others.',
+            id='core.E002',
+        )]
+
+    return []
+
+
+@register()
+def check_autocomplete_cache(app_configs, **kwargs):
+    """Refuse autocomplete caching with generations not shared."""
+    if settings.AUTOCOMPLETE_CACHE and not is_shared_cache(
+        settings.RECIPE_CACHE_ALIAS
+    ):
+        return [Error(
+            'AUTOCOMPLETE_CACHE requires a cache shared by all workers.',
+            hint='Set CACHE_BACKEND to a shared cache or '
+                 'AUTOCOMPLETE_CACHE=0. Names written through one worker '
+                 'would not invalidate results cached by the others.',
+            id='core.E004',
+        )]
+
+    return []
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    """Refuse read replicas with pins in cache not shared by workers."""
+    if settings.REPLICA_DATABASES and not is_shared_cache(
+        settings.REPLICA_CACHE_ALIAS
+    ):
+        return [Error(
+            'DB_REPLICA_HOSTS requires a cache shared by all workers.',
+            hint='Set CACHE_BACKEND to a shared cache. A user pinned to '
+                 'the primary after a write by one worker would read '
+                 'from a replica through the others.',
+            id='core.E003',
+        )]
+
+    return []
@@ -0,0 +1,167 @@
+"""
+Resized variants of recipe images.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from PIL import (
+    Image,
+    features,
+)
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import (
+    connections,
+    transaction,
+)
+from django.utils import timezone
+
+from core.models import Recipe
+from core.storage import delete_unreferenced
+
+
+logger = logging.getLogger(__name__)
+
+# variant name -> bounding box. Images are scaled down keeping aspect
+# ratio, smaller images are not scaled up
+VARIANT_SIZES = {
+    'thumb': (150, 150),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+
+_executor = None
+
+
+def get_variant_format():
+    """Return format of variants - WebP when Pillow supports it."""
+    if settings.IMAGE_VARIANT_FORMAT:
+        return settings.IMAGE_VARIANT_FORMAT
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def variant_name(name, variant, image_format):
+    """Return storage name of variant of image stored under name."""
+    root = os.path.splitext(name)[0]
+    ext = '.webp' if image_format == 'WEBP' else '.jpg'
+    return f'{root}_{variant}{ext}'
+
+
+def _render_variant(image, size, image_format):
+    """Return content of image scaled down to fit size."""
+    variant = image.copy()
+    variant.thumbnail(size)
+    if image_format == 'JPEG' and variant.mode not in ('RGB', 'L'):
+        variant = variant.convert('RGB')
+    output = io.BytesIO()
+    variant.save(output, format=image_format, quality=85)
+
+    return ContentFile(output.getvalue())
+
+
+def generate_variants(recipe_id):
+    """Create resized variants of recipe image and store their names."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+
+    name = recipe.image.name
+    storage = recipe.image.storage
+    image_format = get_variant_format()
+    variants = {}
+    with storage.open(name) as image_file, Image.open(image_file) as image:
+        image.load()
+        for variant, size in VARIANT_SIZES.items():
+            # stored under hash of content, existing file is reused
+            target = variant_name(name, variant, image_format)
+            variants[variant] = storage.save(
+                target, _render_variant(image, size, image_format),
+            )
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).first()
+        # image could be replaced or recipe removed meanwhile
+        if recipe is None or recipe.image.name != name:
+            delete_variants(storage, variants)
+            return
+        recipe.image_variants = variants
+        # save (not update) - post_save signals invalidate cached responses
+        recipe.save(update_fields=['image_variants', 'updated_at'])
+
+
+def get_missing_variants(updated_before):
+    """Return recipes with image but without variants, by id."""
+    # image_variants are reset when the image changes
+    return Recipe.objects.filter(
+        image__isnull=False,
+        image_variants={},
+        updated_at__lt=updated_before,
+    ).exclude(image='').order_by('id')
+
+
+def generate_missing_variants(grace_period):
+    """Generate missing variants, return numbers of recipes and failures."""
+    updated_before = timezone.now() - timedelta(seconds=grace_period)
+    ids = list(
+        get_missing_variants(updated_before).values_list('id', flat=True)
+    )
+    failed = sum(
+        not try_generate_variants(recipe_id) for recipe_id in ids
+    )
+
+    return len(ids), failed
+
+
+def delete_variants(storage, variants):
+    """Remove variant files no recipe refers to from storage."""
+    # files are shared by recipes with the same image
+    delete_unreferenced(storage, variants.values())
+
+
+def try_generate_variants(recipe_id):
+    """Generate variants, log error instead of raising it."""
+    try:
+        generate_variants(recipe_id)
+    except Exception:
+        logger.exception('Generating variants of recipe %s failed.',
+                         recipe_id)
+        return False
+
+    return True
+
+
+def _run_job(recipe_id):
+    """Generate variants in worker thread."""
+    try:
+        try_generate_variants(recipe_id)
+    finally:
+        # worker thread has own database connection - do not leak it
+        connections.close_all()
+
+
+def _get_executor():
+    # created lazily, so it is not shared between forked uWSGI workers
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS,
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def schedule_variants(recipe):
+    """Generate variants of recipe image off the request path."""
+    # wait for commit - worker uses own connection and must see new image
+    if settings.IMAGE_VARIANTS_SYNC:
+        transaction.on_commit(lambda: generate_variants(recipe.id))
+    else:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_job, recipe.id)
+        )
@@ -0,0 +1,135 @@
+"""
+Database backed queue of recipe image processing jobs.
+"""
+import logging
+from datetime import timedelta
+
+from PIL import Image
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import (
+    images,
+    storage,
+)
+from core.models import (
+    ImageJob,
+    Recipe,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_image(recipe, image):
+    """Store uploaded image and queue its processing, return the job."""
+    job = ImageJob(recipe=recipe)
+    job.image.save(image.name, image, save=False)
+    with transaction.atomic():
+        job.save()
+        # job holds a reference until it is finished, so garbage
+        # collection keeps the file while it waits in the queue
+        storage.acquire({job.image.name})
+
+    return job
+
+
+def _fail_exhausted(stale):
+    """Fail stale running jobs which used up all attempts."""
+    # worker process died on every attempt (e.g. killed when decoding
+    # the image ran out of memory) - do not retry forever
+    with transaction.atomic():
+        exhausted = ImageJob.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            status=ImageJob.RUNNING,
+            started_at__lt=stale,
+            attempts__gte=settings.IMAGE_JOB_MAX_ATTEMPTS,
+        )
+        for job in exhausted:
+            logger.error('Image job %s timed out on every attempt.', job.id)
+            _finish(job, ImageJob.FAILED, 'Processing timed out.')
+
+
+def claim_job():
+    """Mark the oldest waiting job running and return it, None if none."""
+    # jobs of crashed workers stay running - claim them again after timeout
+    stale = timezone.now() - timedelta(seconds=settings.IMAGE_JOB_TIMEOUT)
+    _fail_exhausted(stale)
+    with transaction.atomic():
+        # skip locked - concurrent workers claim different jobs
+        job = ImageJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=ImageJob.PENDING)
+            | Q(
+                status=ImageJob.RUNNING,
+                started_at__lt=stale,
+                attempts__lt=settings.IMAGE_JOB_MAX_ATTEMPTS,
+            )
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.status = ImageJob.RUNNING
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+
+    return job
+
+
+def _finish(job, status, error=''):
+    """Store result of running job and release its file."""
+    finished_at = timezone.now()
+    with transaction.atomic():
+        # job is removed together with its recipe, its file is released
+        # by signal then (core.signals)
+        finished = ImageJob.objects.filter(
+            pk=job.pk, status=ImageJob.RUNNING,
+        ).update(status=status, error=error, finished_at=finished_at)
+        if finished:
+            storage.release({job.image.name})
+    job.status = status
+    job.error = error
+    job.finished_at = finished_at
+
+
+def process_job(job):
+    """Set job image as recipe image and generate its variants."""
+    try:
+        with job.image.open() as image_file, \
+                Image.open(image_file) as image:
+            # upload request checked only the header, decode whole image
+            image.load()
+    except Exception as error:
+        _finish(job, ImageJob.FAILED, f'Invalid image: {error}')
+        return
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=job.recipe_id,
+        ).first()
+        if recipe is None:
+            return
+        # file is already stored, recipe only points to it
+        recipe.image = job.image.name
+        recipe.image_variants = {}
+        recipe.save(update_fields=['image', 'image_variants', 'updated_at'])
+    images.generate_variants(recipe.id)
+    _finish(job, ImageJob.DONE)
+
+
+def run_job(job):
+    """Process claimed job, queue it again after unexpected error."""
+    try:
+        process_job(job)
+    except Exception:
+        logger.exception('Image job %s failed.', job.id)
+        if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+            _finish(job, ImageJob.FAILED, 'Processing failed.')
+        else:
+            ImageJob.objects.filter(pk=job.pk).update(
+                status=ImageJob.PENDING,
+            )
+            job.status = ImageJob.PENDING
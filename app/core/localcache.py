@@ -0,0 +1,46 @@
+"""
+In process cache shared by threads of a worker.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """Bounded in process LRU cache with TTL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        """Return value stored under key, None when missing or expired."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            # recently used items are evicted last
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_size):
+        """Store value under key, evict least recently used above max_size."""
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key from cache."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """Remove all items."""
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,208 @@
+"""
+Django command comparing concurrency of WSGI and ASGI serving modes.
+"""
+import asyncio
+import gc
+import resource
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connections
+from django.test.client import FakePayload
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from app.asgi import AsyncViewsASGIHandler
+from core import benchmarks
+
+
+def _get_host():
+    """Return host name accepted by ALLOWED_HOSTS."""
+    hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+    if not hosts:
+        raise CommandError('Set ALLOWED_HOSTS to make requests.')
+    return hosts[0].lstrip('.')
+
+
+class Command(BaseCommand):
+    """Benchmark uWSGI like worker slots against one ASGI event loop."""
+    help = 'Compare throughput and latency of WSGI and ASGI handlers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='WSGI worker slots, like uWSGI processes.')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=400,
+                            help='Number of requests of each mode.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded data for next runs.')
+
+    def _get_wsgi(self, path, token):
+        """Return function making WSGI request, returning status."""
+        handler = WSGIHandler()
+
+        def request():
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': self.host,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': self.host,
+                'HTTP_AUTHORIZATION': f'Token {token}',
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': FakePayload(b''),
+                'wsgi.errors': self.stderr,
+            }
+            statuses = []
+            response = handler(
+                environ, lambda status, headers: statuses.append(status),
+            )
+            b''.join(response)
+            response.close()
+            return int(statuses[0].split()[0])
+
+        return request
+
+    def _get_asgi(self, path, token):
+        """Return coroutine function making ASGI request."""
+        handler = AsyncViewsASGIHandler()
+
+        async def request():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': b'',
+                'root_path': '',
+                'headers': [
+                    (b'host', self.host.encode()),
+                    (b'authorization', f'Token {token}'.encode()),
+                ],
+                'client': ('127.0.0.1', 0),
+                'server': (self.host, 80),
+            }
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await handler(scope, receive, send)
+            return statuses[0]
+
+        return request
+
+    def _run_wsgi(self, request, options):
+        """Run requests in worker slots, return timings and duration."""
+        # a uWSGI worker serves one request at a time, other clients wait
+        # in the listen queue
+        workers = threading.BoundedSemaphore(options['workers'])
+        timings, errors = [], []
+
+        def client(requests):
+            try:
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    with workers:
+                        status = request()
+                    if status != 200:
+                        raise CommandError(f'WSGI request failed: {status}')
+                    timings.append((time.perf_counter() - start) * 1000)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=client, args=(requests,))
+            for requests in self._split_requests(options)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        return timings, time.perf_counter() - start
+
+    def _run_asgi(self, request, options):
+        """Run requests on event loop, return timings and duration."""
+        timings = []
+
+        async def client(requests):
+            for _ in range(requests):
+                start = time.perf_counter()
+                status = await request()
+                if status != 200:
+                    raise CommandError(f'ASGI request failed: {status}')
+                timings.append((time.perf_counter() - start) * 1000)
+
+        async def run():
+            await asyncio.gather(*[
+                client(requests) for requests in self._split_requests(options)
+            ])
+
+        start = time.perf_counter()
+        # shuts the thread pool down. Connections of its exited threads
+        # are closed when their wrappers are collected
+        asyncio.run(run())
+        gc.collect()
+
+        return timings, time.perf_counter() - start
+
+    def _split_requests(self, options):
+        """Return number of requests of every concurrent client."""
+        clients = options['concurrency']
+        share, rest = divmod(options['requests'], clients)
+        return [share + (i < rest) for i in range(clients)]
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = benchmarks.get_benchmark_user()
+        benchmarks.seed_recipes(
+            user, options['recipes'], log=self.stdout.write,
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        self.host = _get_host()
+
+        for name in ['health-check', 'recipe:recipe-list']:
+            path = reverse(name)
+            modes = [
+                (f'{name} WSGI {options["workers"]} workers',
+                 self._run_wsgi, self._get_wsgi(path, token.key)),
+                (f'{name} ASGI 1 process',
+                 self._run_asgi, self._get_asgi(path, token.key)),
+            ]
+            for label, run, request in modes:
+                timings, duration = run(request, options)
+                self.stdout.write(
+                    benchmarks.format_timings(label, timings)
+                    + f', {len(timings) / duration:.0f} req/s'
+                )
+
+        # memory of uWSGI mode grows with workers, ASGI serves all
+        # clients from one process
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+        self.stdout.write(f'Peak memory of one process: {rss} MB')
+
+        if not options['keep']:
+            benchmarks.delete_benchmark_user()
@@ -0,0 +1,72 @@
+"""
+Django command comparing tag/ingredient list query plans.
+"""
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from core import benchmarks
+from core.models import (
+    Tag,
+    Ingredient,
+)
+from recipe import filters
+
+
+class Command(BaseCommand):
+    """Benchmark DISTINCT over JOIN against EXISTS and counted lists."""
+    help = 'Compare assigned_only and recipe count query plans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--explain', action='store_true',
+                            help='Print EXPLAIN ANALYZE of each plan.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded data for next runs.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = benchmarks.get_benchmark_user()
+        benchmarks.seed_recipes(
+            user, options['recipes'], log=self.stdout.write,
+        )
+
+        name_order = filters.ATTR_ORDERINGS[filters.ORDER_NAME]
+        popular_order = filters.ATTR_ORDERINGS[filters.ORDER_POPULAR]
+        for model in [Tag, Ingredient]:
+            base = model.objects.filter(user=user)
+            counted = filters.annotate_recipe_count(base)
+            plans = {
+                # plan used before, assigned_only over the joined rows
+                'join + distinct': base.filter(
+                    recipe__isnull=False,
+                ).order_by(*name_order).distinct(),
+                'exists': filters.filter_assigned(base).order_by(
+                    *name_order
+                ),
+                'count + having': filters.filter_assigned(counted).order_by(
+                    *name_order
+                ),
+                'count + popular': counted.order_by(*popular_order),
+            }
+
+            expected = list(
+                plans['join + distinct'].values_list('id', flat=True)
+            )
+            for label, queryset in plans.items():
+                ids = queryset.values_list('id', flat=True)
+                if label != 'count + popular' and list(ids) != expected:
+                    raise CommandError(f'{label} returned different rows.')
+                timings = benchmarks.time_callable(
+                    lambda: list(ids.all()), options['repeat'],
+                )
+                self.stdout.write(benchmarks.format_timings(
+                    f'{model.__name__} {label}', timings,
+                ))
+                if options['explain']:
+                    self.stdout.write(queryset.explain(analyze=True))
+
+        if not options['keep']:
+            benchmarks.delete_benchmark_user()
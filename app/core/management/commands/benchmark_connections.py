@@ -0,0 +1,81 @@
+"""
+Django command load testing database connection handling.
+"""
+import threading
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connections
+
+from core import benchmarks
+from core.backends.postgresql import pool
+
+
+# database settings of compared modes
+MODES = {
+    'connect per request': {'CONN_MAX_AGE': 0, 'POOL_SIZE': 0},
+    'persistent': {'CONN_MAX_AGE': 60, 'POOL_SIZE': 0},
+    'pool': {'CONN_MAX_AGE': 0},
+}
+
+
+class Command(BaseCommand):
+    """Benchmark new, persistent and pooled connections per request."""
+    help = 'Measure request latency of database connection modes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Concurrent threads, like uWSGI threads.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Number of requests of each thread.')
+        parser.add_argument('--pool-size', type=int, default=2,
+                            help='Connections shared by the threads.')
+
+    def _run_thread(self, settings_dict, requests, timings, errors):
+        """Simulate requests running one query, collect timings."""
+        # postgres signal handlers look the connection up by alias
+        wrapper = type(connections['default'])(settings_dict, 'default')
+
+        def request():
+            # request_started and request_finished signals call this
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+
+        try:
+            timings.extend(benchmarks.time_callable(request, requests))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            wrapper.close()
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for label, mode in MODES.items():
+            settings_dict = {
+                **connections['default'].settings_dict,
+                'POOL_SIZE': options['pool_size'],
+                **mode,
+            }
+            timings, errors = [], []
+            threads = [
+                threading.Thread(
+                    target=self._run_thread,
+                    args=(settings_dict, options['requests'], timings,
+                          errors),
+                )
+                for _ in range(options['threads'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pool.close_pools()
+            if errors:
+                raise CommandError(f'{label} failed: {errors[0]}')
+
+            self.stdout.write(benchmarks.format_timings(label, timings))
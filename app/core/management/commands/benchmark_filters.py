@@ -0,0 +1,78 @@
+"""
+Django command comparing recipe filter query plans.
+"""
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from core import benchmarks
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import filters
+
+
+class Command(BaseCommand):
+    """Benchmark DISTINCT over JOIN against EXISTS recipe filtering."""
+    help = 'Compare recipe filter query plans on a seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--filter-size', type=int, default=10,
+                            help='Number of tag/ingredient ids to filter.')
+        parser.add_argument('--limit', type=int, default=50,
+                            help='Number of recipes fetched (page size).')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--explain', action='store_true',
+                            help='Print EXPLAIN ANALYZE of each plan.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded data for next runs.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = benchmarks.get_benchmark_user()
+        benchmarks.seed_recipes(
+            user, options['recipes'], log=self.stdout.write,
+        )
+        size = options['filter_size']
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:size]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:size]
+        )
+
+        base = Recipe.objects.filter(user=user)
+        # plan used before the filter engine was introduced
+        join_distinct = base.filter(
+            tags__id__in=tag_ids,
+            ingredients__id__in=ingredient_ids,
+        ).order_by('-id').distinct()
+        plans = {'join + distinct': join_distinct}
+        for match in filters.MATCH_CHOICES:
+            plans[f'exists ({match})'] = filters.filter_recipes(
+                base, tag_ids, ingredient_ids, match,
+            ).order_by('-id')
+
+        limit = options['limit']
+        expected = list(join_distinct.values_list('id', flat=True)[:limit])
+        for label, queryset in plans.items():
+            page = queryset.values_list('id', flat=True)[:limit]
+            if label == f'exists ({filters.MATCH_ANY})':
+                # any-match must return the same rows as the old plan
+                if list(page) != expected:
+                    raise CommandError(f'{label} returned different rows.')
+            timings = benchmarks.time_callable(
+                lambda: list(page.all()), options['repeat'],
+            )
+            self.stdout.write(benchmarks.format_timings(label, timings))
+            if options['explain']:
+                self.stdout.write(queryset[:limit].explain(analyze=True))
+
+        if not options['keep']:
+            benchmarks.delete_benchmark_user()
@@ -0,0 +1,91 @@
+"""
+Django command benchmarking full text recipe search.
+"""
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db.models import (
+    Max,
+    Min,
+    Q,
+)
+
+from core import benchmarks
+from core.models import Recipe
+from recipe import search
+
+
+TARGET_MS = 50
+
+
+class Command(BaseCommand):
+    """Benchmark ranked full text search against ILIKE scans."""
+    help = 'Measure recipe search latency on a seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--limit', type=int, default=50,
+                            help='Number of recipes fetched (page size).')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--explain', action='store_true',
+                            help='Print EXPLAIN ANALYZE of each search.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded data for next runs.')
+
+    def _fill_search_vectors(self, user, batch_size=10000):
+        """Compute search vectors of seeded recipes missing them."""
+        # seeding uses bulk_create which does not send signals
+        missing = Recipe.objects.filter(user=user, search_vector=None)
+        bounds = missing.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            search.update_search_vectors(missing.filter(
+                id__gte=start, id__lt=start + batch_size,
+            ))
+            self.stdout.write(f'Indexed recipes up to id {start}')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = benchmarks.get_benchmark_user()
+        benchmarks.seed_recipes(
+            user, options['recipes'], log=self.stdout.write,
+        )
+        self._fill_search_vectors(user)
+
+        base = Recipe.objects.filter(user=user)
+        limit = options['limit']
+        # most common word, a rare one, a combination and a phrase
+        queries = [
+            benchmarks.WORDS[0],
+            benchmarks.WORDS[-1],
+            f'{benchmarks.WORDS[1]} {benchmarks.WORDS[-2]}',
+            f'"{benchmarks.WORDS[2]} {benchmarks.WORDS[3]}"',
+        ]
+        for text in queries:
+            plans = {
+                'full text': search.search_recipes(base, text),
+                # what clients had to do before - substring scan
+                'ilike': base.filter(
+                    Q(title__icontains=text.strip('"'))
+                    | Q(description__icontains=text.strip('"'))
+                ).order_by('-id'),
+            }
+            for label, queryset in plans.items():
+                page = queryset.values_list('id', flat=True)[:limit]
+                timings = benchmarks.time_callable(
+                    lambda: list(page.all()), options['repeat'],
+                )
+                summary = benchmarks.format_timings(
+                    f'{label} [{text}]', timings,
+                )
+                if label == 'full text':
+                    p50 = statistics.median(timings)
+                    verdict = 'OK' if p50 < TARGET_MS else 'SLOW'
+                    summary += f' - target {TARGET_MS} ms: {verdict}'
+                self.stdout.write(summary)
+                if options['explain']:
+                    self.stdout.write(queryset[:limit].explain(analyze=True))
+
+        if not options['keep']:
+            benchmarks.delete_benchmark_user()
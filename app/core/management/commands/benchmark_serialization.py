@@ -0,0 +1,74 @@
+"""
+Django command comparing serializer and fast path list rendering.
+"""
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import (
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core import benchmarks
+from recipe import views
+from recipe.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """Benchmark model serializers against values() rows and orjson."""
+    help = 'Compare list serialization paths and check identical output.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--limit', type=int, default=1000,
+                            help='Number of listed recipes.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded data for next runs.')
+
+    def _get_view(self, viewset, user):
+        """Return list view of viewset for request of user."""
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user)
+        view = viewset(
+            action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={},
+        )
+        view.request = view.initialize_request(request)
+
+        return view
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = benchmarks.get_benchmark_user()
+        benchmarks.seed_recipes(
+            user, options['recipes'], log=self.stdout.write,
+        )
+
+        limit = options['limit']
+        for viewset in [views.RecipeViewset, views.TagViewSet]:
+            view = self._get_view(viewset, user)
+            name = viewset.__name__
+
+            def serialize():
+                serializer = view.get_serializer(
+                    view.get_queryset()[:limit], many=True,
+                )
+                return JSONRenderer().render(serializer.data)
+
+            def serialize_fast():
+                rows = view.get_list_rows(view.get_queryset()[:limit])
+                return FastJSONRenderer().render(view.serialize_rows(rows))
+
+            if serialize_fast() != serialize():
+                raise CommandError(f'{name} fast path output differs.')
+            for label, func in [('serializer', serialize),
+                                ('fast path', serialize_fast)]:
+                timings = benchmarks.time_callable(func, options['repeat'])
+                self.stdout.write(
+                    benchmarks.format_timings(f'{name} {label}', timings)
+                )
+
+        if not options['keep']:
+            benchmarks.delete_benchmark_user()
@@ -0,0 +1,113 @@
+"""
+Django command removing unreferenced stored files.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import StoredFile
+
+
+BATCH_SIZE = 1000
+# directories of content addressed uploads
+UPLOAD_DIRS = ['uploads/recipe']
+
+
+class Command(BaseCommand):
+    """Remove files no recipe refers to from storage."""
+    help = 'Remove unreferenced and orphaned uploaded files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period',
+            type=int,
+            default=settings.STORAGE_GC_GRACE_PERIOD,
+            help='Keep files used in the last seconds.',
+        )
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report files which would be removed.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.dry_run = options['dry_run']
+        self.cutoff = time.time() - options['grace_period']
+        unreferenced = self._collect_unreferenced(options['grace_period'])
+        orphaned = self._collect_orphaned()
+        action = 'Would remove' if self.dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {unreferenced} unreferenced and {orphaned} '
+            f'orphaned files.'
+        ))
+
+    def _is_expired(self, name):
+        """Return whether file was not used in grace period."""
+        try:
+            modified = default_storage.get_modified_time(name).timestamp()
+        except FileNotFoundError:
+            return True
+        return modified < self.cutoff
+
+    def _delete(self, name):
+        """Remove file from storage unless running dry."""
+        if self.dry_run:
+            self.stdout.write(f'Would remove {name}')
+        else:
+            default_storage.delete(name)
+
+    def _collect_unreferenced(self, grace_period):
+        """Remove files whose reference count dropped to zero."""
+        updated_before = timezone.now() - timedelta(seconds=grace_period)
+        removed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # rows are locked - acquiring a reference meanwhile waits
+                # and recreates the row after it is removed
+                files = list(StoredFile.objects.select_for_update(
+                    skip_locked=True,
+                ).filter(
+                    refcount=0,
+                    updated_at__lt=updated_before,
+                    id__gt=last_id,
+                ).order_by('id')[:BATCH_SIZE])
+                if not files:
+                    return removed
+                last_id = files[-1].id
+                expired = [
+                    stored for stored in files
+                    if self._is_expired(stored.name)
+                ]
+                for stored in expired:
+                    self._delete(stored.name)
+                if not self.dry_run:
+                    StoredFile.objects.filter(
+                        id__in=[stored.id for stored in expired],
+                    ).delete()
+                removed += len(expired)
+
+    def _collect_orphaned(self):
+        """Remove files without any reference count row."""
+        removed = 0
+        for upload_dir in UPLOAD_DIRS:
+            names = []
+            for root, dirs, files in os.walk(default_storage.path(upload_dir)):
+                directory = os.path.relpath(root, default_storage.location)
+                names.extend(os.path.join(directory, name) for name in files)
+            for start in range(0, len(names), BATCH_SIZE):
+                batch = names[start:start + BATCH_SIZE]
+                known = set(StoredFile.objects.filter(
+                    name__in=batch,
+                ).values_list('name', flat=True))
+                # includes temporary files left by interrupted uploads
+                for name in batch:
+                    if name not in known and self._is_expired(name):
+                        self._delete(name)
+                        removed += 1
+
+        return removed
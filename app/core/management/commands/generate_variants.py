@@ -0,0 +1,32 @@
+"""
+Django command generating missing variants of recipe images.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    """Regenerate variants lost with recycled workers."""
+    help = 'Generate variants of recipe images which have none.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period',
+            type=int,
+            default=settings.IMAGE_VARIANT_GRACE_PERIOD,
+            help='Skip images changed in the last seconds, their variants '
+                 'may still be generated.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count, failed = images.generate_missing_variants(
+            options['grace_period'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants of {count - failed} recipes, '
+            f'{failed} failed.'
+        ))
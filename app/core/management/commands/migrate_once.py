@@ -0,0 +1,82 @@
+"""
+Django command applying migrations once across app replicas.
+"""
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    connections,
+)
+from django.db.migrations.executor import MigrationExecutor
+
+
+# key of Postgres advisory lock held while migrating
+MIGRATION_LOCK_ID = 4260917
+# seconds between attempts to acquire the lock
+LOCK_POLL_INTERVAL = 1
+
+
+class Command(BaseCommand):
+    """Apply migrations under advisory lock, skip if nothing to apply."""
+    help = 'Apply unapplied migrations, one replica at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def _lock(self, connection):
+        """Wait until migration lock is acquired, no-op if not Postgres."""
+        if connection.vendor != 'postgresql':
+            return
+        # blocking pg_advisory_lock() keeps a snapshot open while waiting,
+        # CREATE INDEX CONCURRENTLY of the migrating replica waits for it
+        # and the two sessions deadlock - poll without a query in flight
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_try_advisory_lock(%s)', [MIGRATION_LOCK_ID],
+                )
+                if cursor.fetchone()[0]:
+                    return
+            self.stdout.write(
+                'Migrations running in other replica, '
+                f'waiting {LOCK_POLL_INTERVAL} second...'
+            )
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    def _unlock(self, connection):
+        """Release migration lock, no-op if not Postgres."""
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID],
+            )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.perf_counter()
+        call_command('wait_for_db', stdout=self.stdout)
+        connection = connections[options['database']]
+
+        # other replicas wait here until the first one finished migrating,
+        # then they find nothing to apply
+        self._lock(connection)
+        try:
+            executor = MigrationExecutor(connection)
+            targets = executor.loader.graph.leaf_nodes()
+            if executor.migration_plan(targets):
+                call_command(
+                    'migrate', database=options['database'],
+                    interactive=False, stdout=self.stdout,
+                )
+            else:
+                self.stdout.write('No migrations to apply.')
+        finally:
+            self._unlock(connection)
+
+        duration = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(f'Migrations checked in {duration:.0f} ms')
+        )
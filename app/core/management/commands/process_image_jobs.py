@@ -0,0 +1,67 @@
+"""
+Django command processing queued recipe image jobs.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import (
+    images,
+    jobs,
+)
+
+
+class Command(BaseCommand):
+    """Worker processing image jobs off the API workers."""
+    help = 'Process queued recipe image uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty.')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.IMAGE_JOB_POLL_INTERVAL,
+            help='Seconds to wait when the queue is empty.',
+        )
+        parser.add_argument(
+            '--sweep-interval',
+            type=int,
+            default=settings.IMAGE_VARIANT_SWEEP_INTERVAL,
+            help='Seconds between generating missing image variants, '
+                 '0 disables it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write('Waiting for image jobs...')
+        next_sweep = time.monotonic()
+        while True:
+            # worker is long running - drop broken or expired connections
+            close_old_connections()
+            if (options['sweep_interval'] and
+                    time.monotonic() >= next_sweep):
+                self._sweep_variants()
+                next_sweep = time.monotonic() + options['sweep_interval']
+            job = jobs.claim_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            jobs.run_job(job)
+            self.stdout.write(f'Image job {job.id}: {job.status}')
+
+    def _sweep_variants(self):
+        """Generate variants lost with recycled API workers."""
+        count, failed = images.generate_missing_variants(
+            settings.IMAGE_VARIANT_GRACE_PERIOD,
+        )
+        if count:
+            self.stdout.write(
+                f'Generated variants of {count - failed} recipes, '
+                f'{failed} failed.'
+            )
@@ -0,0 +1,118 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models, transaction
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags/ingredients with the same name for a user."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tag'), ('Ingredient', 'ingredient')):
+        Model = apps.get_model('core', model_name)
+        Through = getattr(Recipe, f'{field}s').through
+        duplicates = Model.objects.values('user_id', 'name').annotate(
+            keep_id=Min('id'),
+            total=Count('id'),
+        ).filter(total__gt=1)
+        for dup in duplicates:
+            with transaction.atomic():
+                others = Model.objects.filter(
+                    user_id=dup['user_id'],
+                    name=dup['name'],
+                ).exclude(id=dup['keep_id'])
+                linked = set(Through.objects.filter(
+                    **{f'{field}_id': dup['keep_id']}
+                ).values_list('recipe_id', flat=True))
+                to_link = set(Through.objects.filter(
+                    **{f'{field}__in': others}
+                ).values_list('recipe_id', flat=True)) - linked
+                Through.objects.bulk_create([
+                    Through(recipe_id=recipe_id,
+                            **{f'{field}_id': dup['keep_id']})
+                    for recipe_id in to_link
+                ])
+                others.delete()
+
+
+def unique_index_sql(table, name):
+    """Return SQL building unique constraint without locking writes."""
+    # build the index concurrently, then attach it as the constraint
+    # Django expects - attaching an existing index is instant
+    return [
+        f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+        f'ON {table} (user_id, name);',
+        f'ALTER TABLE {table} ADD CONSTRAINT {name} '
+        f'UNIQUE USING INDEX {name};',
+    ]
+
+
+def reverse_index_sql(table, column, name):
+    """Return SQL for (column, recipe_id) index on M2M through table."""
+    # forward direction (recipe_id, column) is covered by the unique
+    # constraint Django creates for through tables
+    return migrations.RunSQL(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+        f'ON {table} ({column}, recipe_id);',
+        f'DROP INDEX CONCURRENTLY IF EXISTS {name};',
+    )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names,
+            migrations.RunPython.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='core_recipe_user_id_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    unique_index_sql(
+                        'core_ingredient', 'core_ingredient_user_name_uniq',
+                    ),
+                    'ALTER TABLE core_ingredient '
+                    'DROP CONSTRAINT core_ingredient_user_name_uniq;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='ingredient',
+                    constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    unique_index_sql('core_tag', 'core_tag_user_name_uniq'),
+                    'ALTER TABLE core_tag '
+                    'DROP CONSTRAINT core_tag_user_name_uniq;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='tag',
+                    constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+                ),
+            ],
+        ),
+        reverse_index_sql(
+            'core_recipe_tags', 'tag_id', 'core_recipe_tags_tag_recipe_idx',
+        ),
+        reverse_index_sql(
+            'core_recipe_ingredients',
+            'ingredient_id',
+            'core_recipe_ingr_ingr_recipe_idx',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:05
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Create reference counts of already stored recipe images."""
+    Recipe = apps.get_model('core', 'Recipe')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    counts = Counter()
+    recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+    for image, variants in recipes.values_list(
+        'image', 'image_variants',
+    ).iterator():
+        counts.update({image, *variants.values()})
+    StoredFile.objects.bulk_create(
+        [
+            StoredFile(name=name, refcount=refcount)
+            for name, refcount in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(condition=models.Q(('refcount', 0)), fields=['updated_at'], name='core_storedfile_unref_idx'),
+        ),
+        migrations.RunPython(
+            count_references,
+            migrations.RunPython.noop,
+        ),
+    ]
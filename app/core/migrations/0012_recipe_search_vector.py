@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, transaction
+from django.db.models import Max
+
+
+BATCH_SIZE = 10000
+
+UPDATE_SQL = '''
+UPDATE core_recipe r SET search_vector =
+    setweight(to_tsvector('english', coalesce(r.title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_recipe_tags rt JOIN core_tag t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_recipe_ingredients ri
+        JOIN core_ingredient i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C')
+    || setweight(to_tsvector('english', coalesce(r.description, '')), 'D')
+WHERE r.id >= %s AND r.id < %s
+'''
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Compute search vectors of existing recipes in batches."""
+    Recipe = apps.get_model('core', 'Recipe')
+    max_id = Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    # short transactions - the table is not locked for the whole backfill
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        with transaction.atomic():
+            schema_editor.execute(UPDATE_SQL, (start, start + BATCH_SIZE))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            fill_search_vectors,
+            migrations.RunPython.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:50
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    TrigramExtension,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='core_ingredient_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='core_tag_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
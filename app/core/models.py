@@ -1,10 +1,11 @@
 """
 Database models.
 """
-import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -15,10 +16,11 @@ from django.contrib.auth.models import (
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
-    ext = os.path.splitext(filename)[1]
-    filename = f'{uuid.uuid4()}{ext}'
+    # storage (core.storage) replaces the name with hash of the content,
+    # only the directory and the extension are kept
+    ext = os.path.splitext(filename)[1].lower()
 
-    return os.path.join('uploads', 'recipe', filename)
+    return os.path.join('uploads', 'recipe', f'image{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -53,6 +55,38 @@ class UserManager(BaseUserManager):
         return user
 
 
+class RecipeAttrManager(models.Manager):
+    """Manager for recipe attributes (tags and ingredients)."""
+
+    def get_or_create_by_names(self, user, names):
+        """Return dict of user's objects by name, create missing ones."""
+        # set based get or create - the number of queries does not depend
+        # on the number of names
+        names = set(names)
+        if not names:
+            return {}
+
+        objs = {
+            obj.name: obj
+            for obj in self.filter(user=user, name__in=names)
+        }
+        missing = names - objs.keys()
+        if missing:
+            # concurrent request could create some of the names meanwhile,
+            # unique (user, name) constraint makes the insert skip them
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            # ids are not returned when conflicts are ignored
+            objs.update({
+                obj.name: obj
+                for obj in self.filter(user=user, name__in=missing)
+            })
+
+        return objs
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """User in the system."""
     email = models.EmailField(max_length=255, unique=True)
@@ -84,6 +118,28 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # storage names of resized variants of image by variant name,
+    # generated in background (see core.images)
+    image_variants = models.JSONField(default=dict, blank=True)
+    # changes also when tags/ingredients of recipe change (see
+    # recipe.signals), used to answer conditional requests
+    updated_at = models.DateTimeField(auto_now=True)
+    # title, description, tag and ingredient names for full text search,
+    # kept up to date by recipe.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # every list query filters by user and orders by newest
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -98,6 +154,27 @@ class Tag(models.Model):
         related_name='tags',
     )
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            # lookups by (user, name) when nested in recipes and listing
+            # ordered by name use this index. Uniqueness makes
+            # get_or_create safe against concurrent requests
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            # prefix and similarity autocomplete of names
+            GinIndex(
+                fields=['name'],
+                name='core_tag_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -111,5 +188,93 @@ class Ingredient(models.Model):
         related_name='ingredients',
     )
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            # lookups by (user, name) when nested in recipes and listing
+            # ordered by name use this index. Uniqueness makes
+            # get_or_create safe against concurrent requests
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            # prefix and similarity autocomplete of names
+            GinIndex(
+                fields=['name'],
+                name='core_ingredient_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class StoredFile(models.Model):
+    """Reference count of file in content addressed storage."""
+    name = models.CharField(max_length=255, unique=True)
+    # number of recipe images and variants using the file, files without
+    # references are removed by gc_files command
+    refcount = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # garbage collection looks up only unreferenced files
+            models.Index(
+                fields=['updated_at'],
+                name='core_storedfile_unref_idx',
+                condition=models.Q(refcount=0),
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImageJob(models.Model):
+    """Queued processing of uploaded recipe image."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    # stored where recipe images are, processing only points recipe to it
+    image = models.ImageField(upload_to=recipe_image_file_path)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # workers claim the oldest unfinished jobs
+            models.Index(
+                fields=['id'],
+                name='core_imagejob_unfinished_idx',
+                condition=models.Q(status__in=['pending', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.status}'
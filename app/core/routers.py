@@ -0,0 +1,133 @@
+"""
+Routing of database reads to replicas.
+
+Reads are sent to a replica only inside replica_reads() - safe requests
+of the recipe APIs (see recipe.views.ReplicaReadMixin). Writes and all
+other reads use the default (primary) database.
+"""
+import contextlib
+import logging
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import (
+    DatabaseError,
+    DEFAULT_DB_ALIAS,
+    connections,
+)
+
+from core.localcache import LocalCache
+
+
+logger = logging.getLogger(__name__)
+
+# seconds the replica is behind the primary, 0 when it is up to date.
+# NULL when it never replayed a transaction - lag is unknown
+LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+'''
+
+_read_database = ContextVar('read_database', default=None)
+# lag is checked at most once per interval in every process
+_lag_cache = LocalCache()
+
+
+def _pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Read from primary for user for a while, after user's write."""
+    # replica may not have replayed the write yet - user must see it
+    caches[settings.REPLICA_CACHE_ALIAS].set(
+        _pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS,
+    )
+
+
+def is_pinned(user_id):
+    """Return whether user reads from primary."""
+    return bool(caches[settings.REPLICA_CACHE_ALIAS].get(_pin_key(user_id)))
+
+
+def get_lag(alias):
+    """Return replication lag of replica in seconds, None if unknown."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        # stand-in databases do not replicate
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        logger.warning('Replica %s unavailable.', alias, exc_info=True)
+        return None
+
+    return None if lag is None else float(lag)
+
+
+def _is_usable(alias):
+    """Return whether replica is reachable and not lagging behind."""
+    usable = _lag_cache.get(alias)
+    if usable is None:
+        lag = get_lag(alias)
+        usable = lag is not None and lag <= settings.REPLICA_MAX_LAG
+        _lag_cache.set(
+            alias,
+            usable,
+            ttl=settings.REPLICA_LAG_CHECK_INTERVAL,
+            max_size=len(settings.REPLICA_DATABASES),
+        )
+
+    return usable
+
+
+def get_replica():
+    """Return alias of usable replica, None when there is none."""
+    replicas = list(settings.REPLICA_DATABASES)
+    # spread load between replicas
+    random.shuffle(replicas)
+    for alias in replicas:
+        if _is_usable(alias):
+            return alias
+
+    return None
+
+
+@contextlib.contextmanager
+def replica_reads(user_id):
+    """Route reads of user inside the block to a replica."""
+    alias = None
+    if settings.REPLICA_DATABASES and not is_pinned(user_id):
+        alias = get_replica()
+    token = _read_database.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads inside replica_reads() to replica, others to primary."""
+
+    def db_for_read(self, model, **hints):
+        """Return replica when reads are routed to it."""
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        """Return primary, replicas are read only."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations, replicas contain the same data."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Migrate primary only, replicas replicate its schema."""
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,84 @@
+"""
+Signal handlers for the core app.
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    post_delete,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core import (
+    authentication,
+    storage,
+)
+from core.models import (
+    ImageJob,
+    Recipe,
+)
+
+# fields holding names of stored files
+RECIPE_FILE_FIELDS = {'image', 'image_variants'}
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Remove changed or deleted token from auth cache."""
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Remove tokens of changed user from auth cache."""
+    # cached tokens hold a copy of the user - deactivated user must be
+    # rejected and updated user must not be served stale
+    if not created:
+        for key in Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True):
+            authentication.invalidate_token(key)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_files(sender, instance, update_fields, **kwargs):
+    """Remember stored files the recipe referred to before save."""
+    instance._previous_files = set()
+    if instance.pk is None or (
+        update_fields is not None
+        and not RECIPE_FILE_FIELDS.intersection(update_fields)
+    ):
+        return
+    previous = Recipe.objects.filter(pk=instance.pk).only(
+        'image', 'image_variants',
+    ).first()
+    if previous is not None:
+        instance._previous_files = storage.get_recipe_files(previous)
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_files(sender, instance, update_fields, **kwargs):
+    """Update reference counts of files the recipe stopped/started using."""
+    if update_fields is not None and not RECIPE_FILE_FIELDS.intersection(
+        update_fields
+    ):
+        return
+    previous = getattr(instance, '_previous_files', set())
+    current = storage.get_recipe_files(instance)
+    storage.release(previous - current)
+    storage.acquire(current - previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_files(sender, instance, **kwargs):
+    """Release files of deleted recipe."""
+    storage.release(storage.get_recipe_files(instance))
+
+
+@receiver(post_delete, sender=ImageJob)
+def release_job_file(sender, instance, **kwargs):
+    """Release file of job removed before it was finished."""
+    if instance.status in (ImageJob.PENDING, ImageJob.RUNNING):
+        storage.release({instance.image.name})
@@ -0,0 +1,26 @@
+"""
+Loading the app before it serves requests.
+"""
+import logging
+import os
+import time
+
+from django.urls import get_resolver
+
+
+logger = logging.getLogger(__name__)
+
+
+def preload(urlconf=None):
+    """Import URLconf with all views and serializers, report startup."""
+    # uWSGI imports the app in master before forking workers, so they
+    # share the loaded code and their first requests do not pay for it
+    get_resolver(urlconf).url_patterns
+
+    # set by scripts/run.sh when the container starts
+    started = os.environ.get('STARTUP_BEGIN')
+    if started:
+        logger.info(
+            'App loaded %.2f s after container start.',
+            time.time() - float(started),
+        )
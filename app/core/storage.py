@@ -0,0 +1,112 @@
+"""
+Content addressed storage of uploaded files.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import StoredFile
+
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+# files are named by SHA-256 of their content, so identical uploads are
+# stored once and a stored file never changes - it can be cached by
+# clients forever. Directory and extension of requested name are kept,
+# the hash is sharded into two levels of subdirectories:
+# uploads/recipe/ab/cd/abcd...ef.jpg
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by hash of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        """Return name as is - the same name means the same content."""
+        return name
+
+    def hashed_name(self, name, digest):
+        """Return name of file with content digest stored under name."""
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{ext}',
+        )
+
+    def _save(self, name, content):
+        """Store content under its hash unless it is stored already."""
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+        name = self.hashed_name(name, sha256.hexdigest())
+        full_path = self.path(name)
+        try:
+            # mark existing file as used, garbage collection skips
+            # recently used files
+            os.utime(full_path)
+            return name
+        except FileNotFoundError:
+            pass
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        # concurrent uploads of the same content write their own temporary
+        # files, the rename is atomic and replaces identical content
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    tmp_file.write(chunk)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return name
+
+
+def get_recipe_files(recipe):
+    """Return names of stored files recipe refers to."""
+    names = set(recipe.image_variants.values())
+    if recipe.image:
+        names.add(recipe.image.name)
+
+    return names
+
+
+def acquire(names):
+    """Add reference to each stored file."""
+    for name in names:
+        # row is missing for new file or when garbage collection removed
+        # it meanwhile - new row is not old enough to be collected
+        while not StoredFile.objects.filter(name=name).update(
+            refcount=F('refcount') + 1,
+            updated_at=timezone.now(),
+        ):
+            StoredFile.objects.get_or_create(name=name)
+
+
+def release(names):
+    """Remove reference to each stored file."""
+    # unreferenced files are removed by gc_files command after grace
+    # period - concurrent upload of the same content could reuse them
+    StoredFile.objects.filter(name__in=names, refcount__gt=0).update(
+        refcount=F('refcount') - 1,
+        updated_at=timezone.now(),
+    )
+
+
+def delete_unreferenced(storage, names):
+    """Remove stored files no recipe refers to."""
+    referenced = set(StoredFile.objects.filter(
+        name__in=names, refcount__gt=0,
+    ).values_list('name', flat=True))
+    for name in set(names) - referenced:
+        storage.delete(name)
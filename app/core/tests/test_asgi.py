@@ -0,0 +1,153 @@
+"""
+Tests for the ASGI serving mode.
+"""
+import asyncio
+import gc
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import (
+    resolve,
+    reverse,
+)
+
+from rest_framework.authtoken.models import Token
+
+from app.asgi import AsyncViewsASGIHandler
+from core.models import Recipe
+
+
+def _scope(path, method='GET', headers=()):
+    """Return ASGI HTTP scope of request."""
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+
+async def _request(path, method='GET', headers=(), body=b''):
+    """Make request through ASGI handler, return status and body."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    if body:
+        headers = [*headers, (b'content-length', str(len(body)).encode())]
+    handler = AsyncViewsASGIHandler()
+    await handler(_scope(path, method, headers), receive, send)
+    content = b''.join(
+        message.get('body', b'') for message in messages
+        if message['type'] == 'http.response.body'
+    )
+    return messages[0]['status'], content
+
+
+# sync_to_async(thread_sensitive=False) runs views in other threads, with
+# own connections, so data has to be committed to be visible
+class ASGITests(TransactionTestCase):
+    """Test requests served through ASGI."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = (b'authorization', f'Token {self.token.key}'.encode())
+
+    def tearDown(self):
+        # connections of exited thread pool threads are closed when their
+        # wrappers are collected, test database can be dropped then
+        gc.collect()
+
+    def test_read_views_are_async(self):
+        """Test hot read endpoints resolve to async views."""
+        names = [
+            'health-check',
+            'recipe:recipe-list',
+            'recipe:tag-list',
+            'recipe:ingredient-list',
+        ]
+        for name in names:
+            match = resolve(reverse(name), urlconf='app.urls_async')
+            self.assertTrue(asyncio.iscoroutinefunction(match.func), name)
+
+        match = resolve(reverse('recipe:recipe-list'))
+        self.assertFalse(asyncio.iscoroutinefunction(match.func))
+
+    def test_health_check(self):
+        """Test async health check."""
+        status, content = async_to_sync(_request)(reverse('health-check'))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content, b'{"healthy":true}')
+
+    def test_recipe_list_and_detail(self):
+        """Test recipe reads through async views."""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00',
+        )
+
+        status, content = async_to_sync(_request)(
+            reverse('recipe:recipe-list'), headers=[self.auth],
+        )
+        self.assertEqual(status, 200)
+        self.assertIn(b'Soup', content)
+
+        status, content = async_to_sync(_request)(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            headers=[self.auth],
+        )
+        self.assertEqual(status, 200)
+        self.assertIn(b'Soup', content)
+
+    @patch('core.asyncviews.STREAM_BATCH_SIZE', 2)
+    def test_recipe_export(self):
+        """Test export streamed from database through ASGI."""
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title=f'Soup {i}', time_minutes=5,
+                price='1.00',
+            )
+
+        status, content = async_to_sync(_request)(
+            reverse('recipe:recipe-export'), headers=[self.auth],
+        )
+
+        self.assertEqual(status, 200)
+        titles = [json.loads(line)['title'] for line in content.splitlines()]
+        self.assertEqual(titles, [f'Soup {i}' for i in reversed(range(5))])
+
+    def test_auth_required(self):
+        """Test async views keep authentication of sync ones."""
+        status, _ = async_to_sync(_request)(reverse('recipe:recipe-list'))
+
+        self.assertEqual(status, 401)
+
+    def test_write_through_async_view(self):
+        """Test unsafe requests are served by async views too."""
+        status, _ = async_to_sync(_request)(
+            reverse('recipe:recipe-list'),
+            method='POST',
+            headers=[self.auth, (b'content-type', b'application/json')],
+            body=b'{"title": "Cake", "time_minutes": 30, "price": "5.00"}',
+        )
+
+        self.assertEqual(status, 201)
+        self.assertTrue(Recipe.objects.filter(title='Cake').exists())
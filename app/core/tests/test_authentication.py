@@ -0,0 +1,178 @@
+"""
+Tests for cached token authentication.
+"""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import authentication
+
+
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+# tests run in one process, local memory cache is shared by all requests
+@override_settings(AUTH_TOKEN_CACHE=True)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching of token lookups."""
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local_cache()
+        authentication.stats.reset()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123', name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test token is looked up in database only once."""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_shared_cache_used_after_local_expired(self):
+        """Test token is found in shared cache of other processes."""
+        self.client.get(ME_URL)
+        authentication.clear_local_cache()
+
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+        self.assertEqual(authentication.stats.shared_hits, 1)
+
+    def test_deleted_token_rejected(self):
+        """Test deleted token is removed from cache."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test token of deactivated user is removed from cache."""
+        self.client.get(RECIPES_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Test updated user is not served from cache."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_password_hash_not_cached(self):
+        """Test cached data does not contain password hash."""
+        self.client.get(ME_URL)
+
+        data = cache.get(authentication._cache_key(self.token.key))
+
+        self.assertNotIn(self.user.password, str(data))
+
+    def test_user_from_cache_keeps_password(self):
+        """Test saving cached user does not overwrite password."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        self.client.patch(ME_URL, {'name': 'Other Name'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Other Name')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(AUTH_TOKEN_CACHE_STATS_INTERVAL=2)
+    def test_stats_logged(self):
+        """Test hit ratio is logged every interval lookups."""
+        with self.assertLogs('core.authentication', level='INFO') as logs:
+            for _ in range(4):
+                self.client.get(ME_URL)
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('hit ratio 0.75', logs.output[-1])
+
+    def test_hit_ratio(self):
+        """Test hit ratio is reported."""
+        for _ in range(4):
+            self.client.get(ME_URL)
+
+        stats = authentication.stats.as_dict()
+
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 3)
+        self.assertEqual(stats['hit_ratio'], 0.75)
+
+    @override_settings(AUTH_TOKEN_CACHE=False)
+    def test_cache_disabled(self):
+        """Test token is looked up on every request when disabled."""
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+
+        self.assertEqual(authentication.stats.as_dict()['hit_ratio'], 0.0)
+        self.assertEqual(authentication.stats.misses, 0)
+
+
+# concurrent request reads in other thread and connection, it sees only
+# committed data
+@override_settings(AUTH_TOKEN_CACHE=True)
+class CachedTokenCommitTests(TransactionTestCase):
+    """Test invalidation of tokens cached while a write commits."""
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local_cache()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached_before_commit_invalidated(self):
+        """Test token cached by concurrent request is invalidated on commit."""
+        concurrent = []
+
+        def get_me():
+            try:
+                concurrent.append(self.client.get(ME_URL).status_code)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.user.is_active = False
+            self.user.save()
+            thread = threading.Thread(target=get_me)
+            thread.start()
+            thread.join()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(concurrent, [status.HTTP_200_OK])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
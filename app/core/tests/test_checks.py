@@ -0,0 +1,84 @@
+"""
+Tests for system checks.
+"""
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+
+from core import checks
+
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+MEMCACHED = {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': 'cache:11211',
+}
+
+
+class CheckTests(SimpleTestCase):
+    """Test checks of configuration."""
+
+    @override_settings(RECIPE_CACHE=True, CACHES={'default': LOCMEM})
+    def test_recipe_cache_local_cache(self):
+        """Test list caching with process local cache is an error."""
+        errors = checks.check_recipe_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(RECIPE_CACHE=True, CACHES={'default': MEMCACHED})
+    def test_recipe_cache_shared_cache(self):
+        """Test list caching with shared cache passes."""
+        self.assertEqual(checks.check_recipe_cache(None), [])
+
+    @override_settings(RECIPE_CACHE=False, CACHES={'default': LOCMEM})
+    def test_recipe_cache_disabled(self):
+        """Test disabled list caching passes with any cache."""
+        self.assertEqual(checks.check_recipe_cache(None), [])
+
+    @override_settings(AUTH_TOKEN_CACHE=True, CACHES={'default': LOCMEM})
+    def test_auth_token_cache_local_cache(self):
+        """Test token caching with process local cache is an error."""
+        errors = checks.check_auth_token_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E002'])
+
+    @override_settings(AUTH_TOKEN_CACHE=True, CACHES={'default': MEMCACHED})
+    def test_auth_token_cache_shared_cache(self):
+        """Test token caching with shared cache passes."""
+        self.assertEqual(checks.check_auth_token_cache(None), [])
+
+    @override_settings(AUTOCOMPLETE_CACHE=True, CACHES={'default': LOCMEM})
+    def test_autocomplete_cache_local_cache(self):
+        """Test autocomplete caching with process local cache is an error."""
+        errors = checks.check_autocomplete_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E004'])
+
+    @override_settings(
+        AUTOCOMPLETE_CACHE=True, CACHES={'default': MEMCACHED},
+    )
+    def test_autocomplete_cache_shared_cache(self):
+        """Test autocomplete caching with shared cache passes."""
+        self.assertEqual(checks.check_autocomplete_cache(None), [])
+
+    @override_settings(
+        REPLICA_DATABASES=['replica1'], CACHES={'default': LOCMEM},
+    )
+    def test_replica_cache_local_cache(self):
+        """Test replicas with process local cache is an error."""
+        errors = checks.check_replica_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E003'])
+
+    @override_settings(
+        REPLICA_DATABASES=['replica1'], CACHES={'default': MEMCACHED},
+    )
+    def test_replica_cache_shared_cache(self):
+        """Test replicas with shared cache passes."""
+        self.assertEqual(checks.check_replica_cache(None), [])
+
+    @override_settings(REPLICA_DATABASES=[], CACHES={'default': LOCMEM})
+    def test_replica_cache_no_replicas(self):
+        """Test no replicas passes with any cache."""
+        self.assertEqual(checks.check_replica_cache(None), [])
@@ -1,13 +1,28 @@
 """
 Test custom Django management commands.
 """
+import threading
+import time
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.db import (
+    connection,
+    connections,
+)
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+)
+
+from core import benchmarks
+from core.management.commands.migrate_once import MIGRATION_LOCK_ID
+from core.models import Recipe
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -51,3 +66,209 @@ class CommandTests(SimpleTestCase):
         self.assertEqual(patched_check.call_count, 6)
         # check if patched check was called with the database
         patched_check.assert_called_with(databases=['default'])
+
+
+@patch('core.management.commands.wait_for_db.Command.check')
+@patch(
+    'core.management.commands.migrate_once.call_command',
+    wraps=call_command,
+)
+class MigrateOnceCommandTests(TestCase):
+    """Test applying migrations once across replicas."""
+
+    def _advisory_locks(self):
+        """Return number of held migration locks."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_locks "
+                "WHERE locktype = 'advisory' AND objid = %s",
+                [MIGRATION_LOCK_ID],
+            )
+            return cursor.fetchone()[0]
+
+    def test_migrate_once_nothing_to_apply(self, patched_call, patched_check):
+        """Test migrate is skipped when database is up to date."""
+        out = StringIO()
+
+        call_command('migrate_once', stdout=out)
+
+        called = [call.args[0] for call in patched_call.call_args_list]
+        self.assertEqual(called, ['wait_for_db'])
+        self.assertIn('No migrations to apply.', out.getvalue())
+        self.assertEqual(self._advisory_locks(), 0)
+
+    @patch('core.management.commands.migrate_once.MigrationExecutor')
+    def test_migrate_once_applies(
+        self, patched_executor, patched_call, patched_check,
+    ):
+        """Test migrate runs under lock when migrations are unapplied."""
+        patched_executor.return_value.migration_plan.return_value = [
+            ('migration', False),
+        ]
+        locks = []
+        patched_call.side_effect = lambda name, **kwargs: locks.append(
+            self._advisory_locks()
+        )
+
+        call_command('migrate_once', stdout=StringIO())
+
+        called = [call.args[0] for call in patched_call.call_args_list]
+        self.assertEqual(called, ['wait_for_db', 'migrate'])
+        # lock held while migrating, released after
+        self.assertEqual(locks[1], 1)
+        self.assertEqual(self._advisory_locks(), 0)
+
+
+# replica waiting for the lock runs in another thread with own connection,
+# the index build has to see committed tables
+@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.migrate_once.LOCK_POLL_INTERVAL', 0.05)
+class MigrateOnceConcurrencyTests(TransactionTestCase):
+    """Test replicas waiting for migrations of another one."""
+
+    def test_waiting_does_not_block_concurrent_index(self, patched_check):
+        """Test index built concurrently while replica waits for lock."""
+        migrating = connection.get_new_connection(
+            connection.get_connection_params()
+        )
+        migrating.autocommit = True
+        out = StringIO()
+        errors = []
+
+        def replica():
+            try:
+                call_command('migrate_once', stdout=out)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        with migrating.cursor() as cursor:
+            # fail instead of hanging when sessions wait for each other
+            cursor.execute("SET statement_timeout = '10s'")
+            cursor.execute(
+                'SELECT pg_advisory_lock(%s)', [MIGRATION_LOCK_ID],
+            )
+            thread = threading.Thread(target=replica)
+            thread.start()
+            for _ in range(200):
+                if 'Migrations running in other replica' in out.getvalue():
+                    break
+                time.sleep(0.05)
+
+            # what migrations 0007, 0012 and 0013 do
+            cursor.execute(
+                'CREATE INDEX CONCURRENTLY test_migrate_once_idx '
+                'ON core_tag (name)'
+            )
+            cursor.execute('DROP INDEX CONCURRENTLY test_migrate_once_idx')
+            cursor.execute(
+                'SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID],
+            )
+        thread.join(timeout=10)
+        migrating.close()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(errors, [])
+        self.assertIn('Migrations running in other replica', out.getvalue())
+        self.assertIn('No migrations to apply.', out.getvalue())
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmark commands."""
+
+    def test_benchmark_filters(self):
+        """Test filter benchmark seeds data, reports timings and cleans up."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_filters', recipes=30, repeat=2, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('join + distinct', output)
+        self.assertIn('exists (all)', output)
+        self.assertFalse(
+            Recipe.objects.filter(user__email=benchmarks.BENCHMARK_EMAIL)
+            .exists()
+        )
+
+    def test_benchmark_attrs(self):
+        """Test tag/ingredient benchmark compares plans and cleans up."""
+        out = StringIO()
+
+        call_command('benchmark_attrs', recipes=30, repeat=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Tag join + distinct', output)
+        self.assertIn('Ingredient count + popular', output)
+        self.assertFalse(
+            Recipe.objects.filter(user__email=benchmarks.BENCHMARK_EMAIL)
+            .exists()
+        )
+
+    def test_benchmark_serialization(self):
+        """Test serialization benchmark checks output and reports."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_serialization', recipes=30, repeat=2, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('RecipeViewset serializer', output)
+        self.assertIn('TagViewSet fast path', output)
+
+    def test_benchmark_connections(self):
+        """Test connection benchmark reports all modes."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_connections', threads=2, requests=3, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('connect per request', output)
+        self.assertIn('persistent', output)
+        self.assertIn('pool', output)
+
+    def test_benchmark_search(self):
+        """Test search benchmark indexes seeded recipes and reports."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_search', recipes=30, repeat=2, keep=True, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('full text', output)
+        self.assertIn('target 50 ms', output)
+        self.assertFalse(
+            Recipe.objects.filter(
+                user__email=benchmarks.BENCHMARK_EMAIL, search_vector=None,
+            ).exists()
+        )
+
+
+# views served through ASGI run in other threads, with own connections,
+# seeded data has to be committed
+class ASGIBenchmarkCommandTests(TransactionTestCase):
+    """Test ASGI benchmark command."""
+
+    def test_benchmark_asgi(self):
+        """Test ASGI benchmark reports both serving modes and cleans up."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_asgi', recipes=10, workers=2, concurrency=4,
+            requests=8, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('recipe:recipe-list WSGI 2 workers', output)
+        self.assertIn('recipe:recipe-list ASGI 1 process', output)
+        self.assertIn('Peak memory', output)
+        self.assertFalse(
+            Recipe.objects.filter(user__email=benchmarks.BENCHMARK_EMAIL)
+            .exists()
+        )
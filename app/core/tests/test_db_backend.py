@@ -0,0 +1,98 @@
+"""
+Tests for the PostgreSQL backend with health checks and pooling.
+"""
+from django.db import (
+    OperationalError,
+    connections,
+)
+from django.test import TestCase
+
+from core.backends.postgresql import pool
+
+
+class DatabaseBackendTests(TestCase):
+    """Test reusing database connections."""
+
+    def setUp(self):
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        pool.close_pools()
+
+    def _create_wrapper(self, **settings):
+        """Return new wrapper of test database with settings."""
+        default = connections['default']
+        settings_dict = {
+            **default.settings_dict,
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL_SIZE': 0,
+            **settings,
+        }
+        # postgres signal handlers look the connection up by alias
+        wrapper = type(default)(settings_dict, alias='default')
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def _query(self, wrapper):
+        """Run query in new request."""
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_persistent_connection_reused(self):
+        """Test connection is kept open between requests."""
+        wrapper = self._create_wrapper()
+        self._query(wrapper)
+        raw = wrapper.connection
+
+        self._query(wrapper)
+
+        self.assertIs(wrapper.connection, raw)
+
+    def test_health_check_replaces_broken_connection(self):
+        """Test connection closed between requests is replaced."""
+        wrapper = self._create_wrapper()
+        self._query(wrapper)
+        raw = wrapper.connection
+        raw.close()
+
+        self.assertEqual(self._query(wrapper), 1)
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_pool_shares_connection(self):
+        """Test connection released by one wrapper is used by other."""
+        first = self._create_wrapper(CONN_MAX_AGE=0, POOL_SIZE=1)
+        second = self._create_wrapper(CONN_MAX_AGE=0, POOL_SIZE=1)
+        self._query(first)
+        raw = first.connection
+        first.close_if_unusable_or_obsolete()
+
+        self._query(second)
+
+        self.assertIsNone(first.connection)
+        self.assertIs(second.connection, raw)
+
+    def test_pool_exhausted(self):
+        """Test waiting for pooled connection times out."""
+        first = self._create_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0.01)
+        second = self._create_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0.01)
+        self._query(first)
+
+        with self.assertRaises(OperationalError):
+            self._query(second)
+
+    def test_pool_drops_broken_connection(self):
+        """Test broken connection is not returned to the pool."""
+        first = self._create_wrapper(POOL_SIZE=1)
+        second = self._create_wrapper(POOL_SIZE=1)
+        self._query(first)
+        raw = first.connection
+        raw.close()
+        first.close()
+
+        self.assertEqual(self._query(second), 1)
+        self.assertIsNot(second.connection, raw)
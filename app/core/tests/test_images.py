@@ -0,0 +1,144 @@
+"""
+Tests for recipe image variants.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import images
+from core.models import Recipe
+
+
+class ImageVariantTests(TestCase):
+    """Test generating image variants."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+
+    def tearDown(self):
+        self.recipe.image.delete()
+
+    def _set_image(self):
+        """Store sample image of recipe."""
+        content = ContentFile(b'')
+        Image.new('RGB', (20, 20)).save(content, format='PNG')
+        self.recipe.image.save('sample.png', content)
+
+    def test_variant_name(self):
+        """Test variant is stored next to original image."""
+        name = images.variant_name('uploads/recipe/a.png', 'thumb', 'WEBP')
+
+        self.assertEqual(name, 'uploads/recipe/a_thumb.webp')
+
+    def test_recipe_without_image_skipped(self):
+        """Test generating variants of recipe without image does nothing."""
+        images.generate_variants(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+
+    def test_replaced_image_variants_discarded(self):
+        """Test variants of image replaced meanwhile are not stored."""
+        self._set_image()
+        image_name = self.recipe.image.name
+        original_save = self.recipe.image.storage.save
+        saved = []
+
+        def save_and_replace(name, content):
+            # simulate upload of new image while variants are generated
+            Recipe.objects.filter(pk=self.recipe.pk).update(image='other.png')
+            saved.append(original_save(name, content))
+            return saved[-1]
+
+        with patch.object(self.recipe.image.storage, 'save',
+                          side_effect=save_and_replace):
+            images.generate_variants(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        for name in saved:
+            self.assertFalse(self.recipe.image.storage.exists(name))
+        # let tearDown remove the original file
+        self.recipe.image.name = image_name
+
+    def test_generate_missing_variants(self):
+        """Test command generates variants lost with recycled worker."""
+        self._set_image()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        out = StringIO()
+
+        call_command('generate_variants', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(self.recipe.image_variants), set(images.VARIANT_SIZES),
+        )
+        self.assertIn('Generated variants of 1 recipes', out.getvalue())
+        for name in self.recipe.image_variants.values():
+            self.recipe.image.storage.delete(name)
+
+    # test runs in a transaction, keep its connection open
+    @patch('core.management.commands.process_image_jobs.'
+           'close_old_connections')
+    def test_worker_sweeps_missing_variants(self, patched_close):
+        """Test job worker regenerates lost variants on schedule."""
+        self._set_image()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        out = StringIO()
+
+        call_command('process_image_jobs', '--once', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(self.recipe.image_variants), set(images.VARIANT_SIZES),
+        )
+        self.assertIn('Generated variants of 1 recipes', out.getvalue())
+        for name in self.recipe.image_variants.values():
+            self.recipe.image.storage.delete(name)
+
+    @patch('core.management.commands.process_image_jobs.'
+           'close_old_connections')
+    def test_worker_sweep_disabled(self, patched_close):
+        """Test sweep interval 0 disables regenerating variants."""
+        self._set_image()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+
+        call_command(
+            'process_image_jobs', '--once', '--sweep-interval', '0',
+            stdout=StringIO(),
+        )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+
+    def test_recent_missing_variants_skipped(self):
+        """Test variants of just uploaded image are left to the pool."""
+        self._set_image()
+
+        call_command('generate_variants', stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
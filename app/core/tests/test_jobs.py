@@ -0,0 +1,156 @@
+"""
+Tests for queued image jobs.
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from core import jobs
+from core.models import (
+    ImageJob,
+    Recipe,
+    StoredFile,
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_content():
+    """Return sample PNG image file."""
+    content = ContentFile(b'', name='sample.png')
+    Image.new('RGB', (20, 20)).save(content, format='PNG')
+    return content
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_JOB_MAX_ATTEMPTS=2)
+class ImageJobTests(TestCase):
+    """Test processing queued image jobs."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def _refcount(self, job):
+        """Return reference count of job image."""
+        return StoredFile.objects.get(name=job.image.name).refcount
+
+    def test_enqueue_references_file(self):
+        """Test queued job keeps its file referenced."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertEqual(self._refcount(job), 1)
+
+    def test_claim_oldest_job(self):
+        """Test jobs are claimed in order, each only once."""
+        first = jobs.enqueue_image(self.recipe, image_content())
+        second = jobs.enqueue_image(self.recipe, image_content())
+
+        self.assertEqual(jobs.claim_job(), first)
+        claimed = jobs.claim_job()
+        self.assertEqual(claimed, second)
+        self.assertEqual(claimed.status, ImageJob.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(jobs.claim_job())
+
+    def test_stale_running_job_claimed_again(self):
+        """Test job of crashed worker is claimed after timeout."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.RUNNING,
+            started_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(jobs.claim_job(), job)
+
+    def test_stale_job_failed_after_max_attempts(self):
+        """Test job crashing worker on every attempt is not retried."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.RUNNING,
+            started_at=timezone.now() - timedelta(days=1),
+            attempts=settings.IMAGE_JOB_MAX_ATTEMPTS,
+        )
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertIsNone(jobs.claim_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.error, 'Processing timed out.')
+        self.assertEqual(self._refcount(job), 0)
+
+    def test_invalid_image_fails_job(self):
+        """Test job with undecodable image fails and releases file."""
+        content = image_content()
+        content.file.truncate(40)
+        job = jobs.enqueue_image(self.recipe, content)
+
+        jobs.run_job(jobs.claim_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertIn('Invalid image', job.error)
+        self.assertEqual(self._refcount(job), 0)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_done_job_moves_reference_to_recipe(self):
+        """Test finished job leaves only the recipe reference."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+
+        jobs.run_job(jobs.claim_job())
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(self.recipe.image.name, job.image.name)
+        self.assertEqual(self._refcount(job), 1)
+
+    @patch('core.images.generate_variants', side_effect=OSError)
+    def test_error_retried_until_max_attempts(self, patched_generate):
+        """Test unexpected errors requeue the job up to max attempts."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.PENDING)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(patched_generate.call_count, 2)
+
+    def test_deleted_recipe_releases_queued_file(self):
+        """Test removing recipe releases files of its queued jobs."""
+        job = jobs.enqueue_image(self.recipe, image_content())
+
+        self.recipe.delete()
+
+        self.assertEqual(self._refcount(job), 0)
@@ -1,9 +1,9 @@
 """
 Test for models.
 """
-from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 # get actual reference to user model
 from django.contrib.auth import get_user_model
@@ -83,6 +83,16 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test tag names are unique for a user."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Tag1')
+        models.Tag.objects.create(user=other_user, name='Tag1')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Tag1')
+
     def test_create_ingredient(self):
         """Test creating an ingredient is successful."""
         user = create_user()
@@ -93,13 +103,9 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
-    # we need to patch uuid - without that, we got random uuid value
-    # and we do not know the value
-    @patch('core.models.uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
+    def test_recipe_file_path(self):
         """Test generating image path."""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_file_path(None, 'example.jpg')
+        # file name is replaced by content hash in storage
+        file_path = models.recipe_image_file_path(None, 'example.JPG')
 
-        self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+        self.assertEqual(file_path, 'uploads/recipe/image.jpg')
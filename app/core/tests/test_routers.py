@@ -0,0 +1,108 @@
+"""
+Tests for routing reads to replica databases.
+"""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+from core import routers
+from core.models import Recipe
+
+
+# primary stands in for replica - routing does not depend on the data
+@override_settings(REPLICA_DATABASES=['default'])
+class ReplicaRouterTests(TestCase):
+    """Test choosing database for reads."""
+
+    def setUp(self):
+        cache.clear()
+        routers._lag_cache.clear()
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads outside replica_reads are not routed."""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_replica_reads(self):
+        """Test reads inside replica_reads go to replica."""
+        with routers.replica_reads(1) as alias:
+            self.assertEqual(alias, 'default')
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_pinned_user_reads_primary(self):
+        """Test user who wrote recently is not routed to replica."""
+        routers.pin_to_primary(1)
+
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        with routers.replica_reads(2):
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    @patch('core.routers.get_lag', return_value=5.0)
+    def test_lagging_replica_skipped(self, patched_lag):
+        """Test replica lagging over threshold is not used, lag cached."""
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+        patched_lag.assert_called_once_with('default')
+
+    @patch('core.routers.get_lag', return_value=None)
+    def test_unavailable_replica_skipped(self, patched_lag):
+        """Test replica with unknown lag is not used."""
+        with routers.replica_reads(1):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_lag_of_primary(self):
+        """Test database which is not in recovery has no lag."""
+        self.assertEqual(routers.get_lag('default'), 0)
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test writes and migrations are never routed to replica."""
+        with routers.replica_reads(1):
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+
+
+# two cache instances stand in for caches of two worker processes, local
+# memory caches of the same LOCATION share storage like a shared cache
+@override_settings(CACHES={
+    'worker_a': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+    'worker_b': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+    'worker_c': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'process-c',
+    },
+})
+class ReplicaPinTests(TestCase):
+    """Test pins of writing users across workers."""
+
+    def test_pin_seen_by_other_worker(self):
+        """Test user pinned by one worker reads primary in another."""
+        with override_settings(REPLICA_CACHE_ALIAS='worker_a'):
+            routers.pin_to_primary(1)
+
+        with override_settings(REPLICA_CACHE_ALIAS='worker_b'):
+            self.assertTrue(routers.is_pinned(1))
+            self.assertFalse(routers.is_pinned(2))
+
+    def test_pin_not_seen_through_unshared_cache(self):
+        """Test pin is lost in a cache not shared with the writer."""
+        with override_settings(REPLICA_CACHE_ALIAS='worker_a'):
+            routers.pin_to_primary(1)
+
+        with override_settings(REPLICA_CACHE_ALIAS='worker_c'):
+            self.assertFalse(routers.is_pinned(1))
@@ -0,0 +1,32 @@
+"""
+Tests for loading the app before serving requests.
+"""
+import os
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core import startup
+
+
+class StartupTests(SimpleTestCase):
+    """Test preloading the app."""
+
+    def test_startup_time_logged(self):
+        """Test time since container start is logged."""
+        env = {'STARTUP_BEGIN': str(time.time() - 2)}
+        with patch.dict(os.environ, env), \
+                self.assertLogs('core.startup', 'INFO') as logs:
+            startup.preload()
+
+        self.assertRegex(logs.output[0], r'App loaded 2\.\d\d s after')
+
+    def test_async_urlconf_preloaded(self):
+        """Test URLconf of ASGI mode is preloaded."""
+        with patch.dict(os.environ, clear=False) as env:
+            env.pop('STARTUP_BEGIN', None)
+            with patch('core.startup.get_resolver') as patched_resolver:
+                startup.preload('app.urls_async')
+
+        patched_resolver.assert_called_once_with('app.urls_async')
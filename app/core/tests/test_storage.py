@@ -0,0 +1,173 @@
+"""
+Tests for content addressed storage.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    StoredFile,
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 5,
+        'price': Decimal('5.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def make_old(name):
+    """Make stored file look unused for a day."""
+    day_ago = time.time() - 24 * 60 * 60
+    os.utime(default_storage.path(name), (day_ago, day_ago))
+    StoredFile.objects.filter(name=name).update(
+        updated_at=timezone.now() - timedelta(days=1),
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    """Test storing files by hash of content."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_file_named_by_content_hash(self):
+        """Test file is stored under sharded hash of its content."""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = default_storage.save(
+            'uploads/recipe/image.PNG', ContentFile(b'content'),
+        )
+
+        self.assertEqual(
+            name,
+            f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.png',
+        )
+        with default_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'content')
+
+    def test_identical_files_stored_once(self):
+        """Test saving the same content reuses stored file."""
+        first = default_storage.save(
+            'uploads/recipe/a.jpg', ContentFile(b'same'),
+        )
+        second = default_storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'same'),
+        )
+        other = default_storage.save(
+            'uploads/recipe/c.jpg', ContentFile(b'other'),
+        )
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(default_storage.path(first)))),
+            1,
+        )
+
+    def test_recipe_images_reference_counted(self):
+        """Test recipes sharing image hold a reference each."""
+        recipe1 = create_recipe(self.user)
+        recipe2 = create_recipe(self.user)
+        recipe1.image.save('a.jpg', ContentFile(b'image'))
+        recipe2.image.save('b.jpg', ContentFile(b'image'))
+        name = recipe1.image.name
+
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 2)
+
+        recipe1.image.save('c.jpg', ContentFile(b'new image'))
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        self.assertEqual(
+            StoredFile.objects.get(name=recipe1.image.name).refcount, 1,
+        )
+
+        recipe2.delete()
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 0)
+
+    def test_variants_reference_counted(self):
+        """Test saving only variants updates their references."""
+        recipe = create_recipe(self.user)
+        variant = default_storage.save(
+            'uploads/recipe/a_thumb.webp', ContentFile(b'thumb'),
+        )
+        recipe.image_variants = {'thumb': variant}
+        recipe.save(update_fields=['image_variants'])
+
+        self.assertEqual(StoredFile.objects.get(name=variant).refcount, 1)
+
+        recipe.title = 'New title'
+        recipe.save(update_fields=['title'])
+        recipe.image_variants = {}
+        recipe.save()
+        self.assertEqual(StoredFile.objects.get(name=variant).refcount, 0)
+
+    def test_gc_removes_unreferenced_files(self):
+        """Test garbage collection removes only unused old files."""
+        recipe = create_recipe(self.user)
+        recipe.image.save('a.jpg', ContentFile(b'kept'))
+        kept = recipe.image.name
+        recipe2 = create_recipe(self.user)
+        recipe2.image.save('b.jpg', ContentFile(b'removed'))
+        removed = recipe2.image.name
+        recipe2.delete()
+        recent = default_storage.save(
+            'uploads/recipe/c.jpg', ContentFile(b'recent'),
+        )
+        orphan = default_storage.save(
+            'uploads/recipe/d.jpg', ContentFile(b'orphan'),
+        )
+        for name in (kept, removed, orphan):
+            make_old(name)
+
+        out = StringIO()
+        call_command('gc_files', stdout=out)
+
+        self.assertIn('Removed 1 unreferenced and 1 orphaned', out.getvalue())
+        self.assertTrue(default_storage.exists(kept))
+        self.assertTrue(default_storage.exists(recent))
+        self.assertFalse(default_storage.exists(removed))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(StoredFile.objects.filter(name=removed).exists())
+
+    def test_gc_dry_run(self):
+        """Test dry run keeps all files."""
+        orphan = default_storage.save(
+            'uploads/recipe/a.jpg', ContentFile(b'orphan'),
+        )
+        make_old(orphan)
+
+        out = StringIO()
+        call_command('gc_files', '--dry-run', stdout=out)
+
+        self.assertIn(f'Would remove {orphan}', out.getvalue())
+        self.assertTrue(default_storage.exists(orphan))
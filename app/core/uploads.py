@@ -0,0 +1,135 @@
+"""
+Streaming upload handling for recipe images.
+"""
+import logging
+import resource
+import time
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    SkipFile,
+    TemporaryFileUploadHandler,
+)
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+
+logger = logging.getLogger(__name__)
+
+# magic bytes of accepted image formats: (format, [(offset, signature)])
+IMAGE_SIGNATURES = [
+    ('JPEG', [(0, b'\xff\xd8\xff')]),
+    ('PNG', [(0, b'\x89PNG\r\n\x1a\n')]),
+    ('GIF', [(0, b'GIF87a')]),
+    ('GIF', [(0, b'GIF89a')]),
+    # RIFF container, 4 bytes of size, WEBP form type
+    ('WEBP', [(0, b'RIFF'), (8, b'WEBP')]),
+]
+# room for multipart boundaries and other form fields in request body
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def detect_image_format(header):
+    """Return image format detected from first bytes of file or None."""
+    for image_format, parts in IMAGE_SIGNATURES:
+        if all(
+            header[offset:offset + len(signature)] == signature
+            for offset, signature in parts
+        ):
+            return image_format
+    return None
+
+
+def get_rss():
+    """Return resident memory of process in KiB, None if unknown."""
+    # current RSS - ru_maxrss is the peak over the whole process lifetime
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+# uploaded file is streamed to temporary file in chunks, nothing is
+# buffered in memory. Request is rejected as early as possible - by its
+# Content-Length, by magic bytes of the first chunk, by size while
+# receiving and by dimensions read from image header before any pixels are
+# decoded. The reason of rejection is kept in error attribute.
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Upload handler validating image on the fly."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        self.max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+        self.error = None
+        self.started = None
+        self.started_rss = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Reject too big request before reading its body."""
+        self.started = time.monotonic()
+        self.started_rss = get_rss()
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            self.error = self._size_error()
+            # returning parsed data stops the parser - body is not read
+            return QueryDict(), MultiValueDict()
+        return None
+
+    def receive_data_chunk(self, raw_data, start):
+        """Write chunk to temporary file, stop on invalid image."""
+        if start == 0 and detect_image_format(raw_data) is None:
+            self.error = 'Upload a valid JPEG, PNG, GIF or WebP image.'
+            raise SkipFile()
+        if start + len(raw_data) > self.max_size:
+            self.error = self._size_error()
+            raise SkipFile()
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        """Check image dimensions from header and report upload stats."""
+        file = super().file_complete(file_size)
+        file.seek(0)
+        try:
+            # open() only reads the header, pixels are not decoded
+            with Image.open(file) as image:
+                width, height = image.size
+        except Exception:
+            self.error = 'Upload a valid image.'
+        else:
+            if width * height > self.max_pixels:
+                # protects from decompression bombs
+                self.error = (
+                    f'Image has {width}x{height} pixels, '
+                    f'at most {self.max_pixels} pixels are allowed.'
+                )
+        if self.error:
+            # file is not passed to the request
+            file.close()
+            return None
+
+        file.seek(0)
+        rss = get_rss()
+        # memory of other requests served by the process meanwhile is
+        # included too
+        rss_delta = (
+            'unknown' if rss is None or self.started_rss is None
+            else f'{rss - self.started_rss:+d} KiB'
+        )
+        logger.info(
+            'Image upload %s: %d bytes in %.1f ms, RSS change %s',
+            file.name,
+            file_size,
+            (time.monotonic() - self.started) * 1000,
+            rss_delta,
+        )
+        return file
+
+    def _size_error(self):
+        """Return error message of too big upload."""
+        return f'Image is larger than {self.max_size} bytes.'
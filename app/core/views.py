@@ -1,6 +1,7 @@
 """
 Core views for app.
 """
+from django.http import HttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
@@ -9,3 +10,8 @@ from rest_framework.response import Response
 def health_check(request):
     """Returns successful response."""
     return Response({'healthy': True})
+
+
+async def health_check_async(request):
+    """Returns successful response, without leaving the event loop."""
+    return HttpResponse(b'{"healthy":true}', content_type='application/json')
@@ -0,0 +1,65 @@
+"""
+Autocomplete of tag and ingredient names.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import (
+    Case,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+
+from core.localcache import LocalCache
+from recipe import cache
+
+
+# users type the same prefixes again and again, keystroke after keystroke
+_local_cache = LocalCache()
+
+
+def complete_names(queryset, text, limit):
+    """Return objects with name starting with or resembling text."""
+    # both conditions are served by the trigram GIN index on name
+    return queryset.filter(
+        Q(name__istartswith=text) | Q(name__trigram_similar=text)
+    ).annotate(
+        is_prefix=Case(
+            When(name__istartswith=text, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        similarity=TrigramSimilarity('name', text),
+    ).order_by('-is_prefix', '-similarity', 'name')[:limit]
+
+
+def get_key(endpoint, user_id, text, limit, assigned_only, with_counts):
+    """Return local cache key of autocomplete results."""
+    # generation changes with every write of the user, so stale results
+    # are never served - they are evicted as least recently used
+    generation = cache.get_generation(user_id)
+    return (
+        endpoint, user_id, generation, text.lower(), limit, assigned_only,
+        with_counts,
+    )
+
+
+def get_data(key):
+    """Return cached results or None."""
+    return _local_cache.get(key)
+
+
+def set_data(key, data):
+    """Cache results."""
+    _local_cache.set(
+        key,
+        data,
+        ttl=settings.AUTOCOMPLETE_CACHE_TTL,
+        max_size=settings.AUTOCOMPLETE_CACHE_SIZE,
+    )
+
+
+def clear():
+    """Remove all cached results of this process."""
+    _local_cache.clear()
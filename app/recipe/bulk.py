@@ -0,0 +1,97 @@
+"""
+Bulk import and export of recipes.
+"""
+import json
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import (
+    cache,
+    search,
+)
+
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_CHUNK_SIZE = 500
+# nested relations of recipe: (field name, model, through FK column)
+RELATIONS = [
+    ('tags', Tag, 'tag_id'),
+    ('ingredients', Ingredient, 'ingredient_id'),
+]
+
+
+def _import_chunk(user, chunk):
+    """Insert validated recipes together with tags and ingredients."""
+    relation_names = {field for field, _, _ in RELATIONS}
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, **{
+            attr: value for attr, value in data.items()
+            if attr not in relation_names
+        })
+        for data in chunk
+    ])
+    for field, model, column in RELATIONS:
+        # tags/ingredients of the whole chunk are resolved at once
+        objs = model.objects.get_or_create_by_names(user, {
+            item['name'] for data in chunk for item in data.get(field, [])
+        })
+        Through = getattr(Recipe, field).through
+        Through.objects.bulk_create([
+            Through(recipe_id=recipe.id, **{column: objs[item['name']].id})
+            for recipe, data in zip(recipes, chunk)
+            for item in data.get(field, [])
+        ], ignore_conflicts=True)
+    # bulk_create does not send signals maintaining search vectors
+    search.update_search_vectors(
+        Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+    )
+
+    return len(recipes)
+
+
+def import_recipes(user, validated_data, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create recipes in chunks and return number of created recipes."""
+    # each chunk is committed separately - a huge import does not hold
+    # one long transaction and the memory of a single chunk is bounded
+    created = 0
+    for start in range(0, len(validated_data), chunk_size):
+        with transaction.atomic():
+            created += _import_chunk(
+                user, validated_data[start:start + chunk_size],
+            )
+    # bulk_create does not send signals which invalidate the cache
+    cache.invalidate_user(user.id)
+
+    return created
+
+
+def _render_chunk(serializer_class, recipes, prefetches):
+    """Yield NDJSON lines for chunk of recipes."""
+    prefetch_related_objects(recipes, *prefetches)
+    for data in serializer_class(recipes, many=True).data:
+        yield json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_recipes(queryset, serializer_class, prefetches,
+                   chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield recipes of queryset as NDJSON lines."""
+    # iterator() ignores prefetch_related() - nested relations are
+    # fetched per chunk with the prefetches of the viewset, so they are
+    # ordered like in the list and detail responses
+    # iterator() reads rows through a server-side cursor, so only one
+    # chunk of recipes is kept in memory regardless of the total count
+    chunk = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield from _render_chunk(serializer_class, chunk, prefetches)
+            chunk = []
+    if chunk:
+        yield from _render_chunk(serializer_class, chunk, prefetches)
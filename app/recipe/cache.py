@@ -0,0 +1,116 @@
+"""
+Per-user cache of recipe API list responses.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _get_cache():
+    """Return cache backend used for recipe API responses."""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _generation_key(user_id):
+    return f'recipe:generation:{user_id}'
+
+
+def _modified_key(user_id):
+    return f'recipe:modified:{user_id}'
+
+
+def get_generation(user_id):
+    """Return current generation of user's recipe data."""
+    cache = _get_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # start from current time instead of 1 - when the counter is
+        # evicted, old cache entries must not match the new generation
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def get_last_modified(user_id):
+    """Return timestamp of the last write of user's recipe data."""
+    cache = _get_cache()
+    key = _modified_key(user_id)
+    last_modified = cache.get(key)
+    if last_modified is None:
+        # time of the last write is unknown - assume it is now
+        cache.add(key, int(time.time()), timeout=None)
+        last_modified = cache.get(key)
+
+    return last_modified
+
+
+def bump_generation(user_id):
+    """Invalidate all cached responses of user."""
+    # entries are not deleted - keys with old generation are never read
+    # again and expire on their own
+    cache = _get_cache()
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        # counter missing - next read starts a new generation anyway
+        pass
+    cache.set(_modified_key(user_id), int(time.time()), timeout=None)
+
+
+def invalidate_user(user_id):
+    """Invalidate cached responses of user, again after commit of write."""
+    bump_generation(user_id)
+    if transaction.get_connection().in_atomic_block:
+        # until the write is committed, concurrent requests read old data
+        # and may cache it under the new generation
+        transaction.on_commit(lambda: bump_generation(user_id))
+
+
+def _normalize_params(query_params):
+    """Return query params in canonical form."""
+    params = []
+    for name in sorted(query_params):
+        value = query_params.get(name)
+        if name in ('tags', 'ingredients'):
+            # order of ids does not change the result
+            value = ','.join(sorted(value.split(',')))
+        params.append(f'{name}={value}')
+
+    return '&'.join(params)
+
+
+def get_list_key(request, endpoint):
+    """Return cache key of list response for request."""
+    generation = get_generation(request.user.id)
+    # host is a part of the key, because paginated responses contain
+    # absolute links to the next/previous pages
+    variant = '|'.join([
+        endpoint,
+        request.get_host(),
+        _normalize_params(request.query_params),
+    ])
+    digest = hashlib.md5(variant.encode()).hexdigest()
+
+    return f'recipe:list:{request.user.id}:{generation}:{digest}'
+
+
+def get_etag(key):
+    """Return ETag of the response cached under key."""
+    # key changes with every write of the user, so it can validate the
+    # response without rendering or hashing the body
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def get_data(key):
+    """Return cached response data or None."""
+    return _get_cache().get(key)
+
+
+def set_data(key, data):
+    """Cache response data."""
+    _get_cache().set(key, data, timeout=settings.RECIPE_CACHE_TIMEOUT)
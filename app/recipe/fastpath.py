@@ -0,0 +1,83 @@
+"""
+Read side serialization of recipe lists from values() rows.
+
+Functions return the same data as the model serializers of
+recipe.serializers, without creating model instances and serializer
+fields for every row.
+"""
+from collections import defaultdict
+
+from core.models import Recipe
+
+
+# columns of listed recipes, in order of RecipeSerializer fields
+RECIPE_COLUMNS = [
+    'id', 'title', 'time_minutes', 'price', 'link', 'image',
+    'image_variants',
+]
+
+
+def get_attr_rows(queryset, with_counts=False):
+    """Return values() rows of tags/ingredients in serializer format."""
+    columns = ['id', 'name']
+    if with_counts:
+        columns.append('recipe_count')
+
+    return queryset.values(*columns)
+
+
+def get_recipe_rows(queryset):
+    """Return values() rows of recipes for serialize_recipes."""
+    # rank of searched recipes is needed by the cursor pagination
+    extra = ['rank'] if 'rank' in queryset.query.annotations else []
+    return queryset.values(*RECIPE_COLUMNS, *extra)
+
+
+def _get_related(relation, field, recipe_ids):
+    """Return tags/ingredients in serializer format by recipe id."""
+    Through = getattr(Recipe, relation).through
+    # same order as the prefetch of RecipeViewset
+    rows = Through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).values_list(
+        'recipe_id', field, f'{field}__name',
+    ).order_by(f'{field}__name', field)
+    related = defaultdict(list)
+    for recipe_id, obj_id, name in rows:
+        related[recipe_id].append({'id': obj_id, 'name': name})
+
+    return related
+
+
+def serialize_recipes(rows, request=None):
+    """Return list of recipe rows in RecipeSerializer format."""
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+    tags, ingredients = {}, {}
+    if recipe_ids:
+        tags = _get_related('tags', 'tag', recipe_ids)
+        ingredients = _get_related('ingredients', 'ingredient', recipe_ids)
+    storage = Recipe._meta.get_field('image').storage
+
+    data = []
+    for row in rows:
+        thumbnail = None
+        if row['image']:
+            # same as RecipeSerializer.get_thumbnail
+            url = storage.url(
+                row['image_variants'].get('thumb', row['image'])
+            )
+            thumbnail = request.build_absolute_uri(url) if request else url
+        data.append({
+            'id': row['id'],
+            'title': row['title'],
+            'time_minutes': row['time_minutes'],
+            # DecimalField output - price column has fixed 2 decimals
+            'price': f'{row["price"]:f}',
+            'link': row['link'],
+            'tags': tags.get(row['id'], []),
+            'ingredients': ingredients.get(row['id'], []),
+            'thumbnail': thumbnail,
+        })
+
+    return data
@@ -0,0 +1,89 @@
+"""
+Filters for the recipe APIs.
+"""
+from django.db.models import (
+    Count,
+    Exists,
+    OuterRef,
+)
+
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = [MATCH_ANY, MATCH_ALL]
+
+ORDER_NAME = 'name'
+ORDER_POPULAR = 'popular'
+ORDER_CHOICES = [ORDER_NAME, ORDER_POPULAR]
+# orderings of tags/ingredients - most used first, ties by name
+ATTR_ORDERINGS = {
+    ORDER_NAME: ('-name',),
+    ORDER_POPULAR: ('-recipe_count', 'name'),
+}
+
+
+def _related_exists(through, field, ids):
+    """Return EXISTS subquery matching recipes linked to any of ids."""
+    return Exists(through.objects.filter(
+        recipe_id=OuterRef('pk'),
+        **{f'{field}__in': ids},
+    ))
+
+
+def filter_by_related(queryset, through, field, ids, match=MATCH_ANY):
+    """Filter recipes by ids of related objects stored in through table."""
+    if not ids:
+        return queryset
+
+    # EXISTS is a semi join - each recipe is returned at most once,
+    # so there is no need for DISTINCT which sorts/hashes the joined rows
+    if match == MATCH_ALL:
+        # one EXISTS per id - each one is a unique index lookup on
+        # (recipe_id, <field>) and Postgres intersects them
+        for obj_id in sorted(set(ids)):
+            queryset = queryset.filter(
+                _related_exists(through, field, [obj_id])
+            )
+        return queryset
+
+    return queryset.filter(_related_exists(through, field, ids))
+
+
+def filter_recipes(queryset, tag_ids=None, ingredient_ids=None,
+                   match=MATCH_ANY):
+    """Filter recipes by tags and ingredients."""
+    queryset = filter_by_related(
+        queryset, Recipe.tags.through, 'tag_id', tag_ids, match,
+    )
+    queryset = filter_by_related(
+        queryset,
+        Recipe.ingredients.through,
+        'ingredient_id',
+        ingredient_ids,
+        match,
+    )
+
+    return queryset
+
+
+def annotate_recipe_count(queryset):
+    """Annotate tags/ingredients with number of recipes using them."""
+    # LEFT JOIN of the through table grouped by primary key - joined rows
+    # are counted, the recipe table itself is not read
+    return queryset.annotate(recipe_count=Count('recipe'))
+
+
+def filter_assigned(queryset):
+    """Filter tags/ingredients used by at least one recipe."""
+    # neither variant needs DISTINCT over the joined rows
+    if 'recipe_count' in queryset.query.annotations:
+        # counts are computed anyway - HAVING COUNT(...) > 0
+        return queryset.filter(recipe_count__gt=0)
+
+    # semi join stops at the first recipe, using index on the foreign key
+    through = queryset.model.recipe_set.through
+    return queryset.filter(Exists(through.objects.filter(**{
+        queryset.model._meta.model_name: OuterRef('pk'),
+    })))
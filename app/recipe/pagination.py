@@ -0,0 +1,55 @@
+"""
+Pagination for the recipe APIs.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+from recipe import filters
+
+
+# cursor pagination seeks on the ordering column
+# (WHERE id < :cursor LIMIT n) instead of using OFFSET, so fetching a deep
+# page costs the same as fetching the first one. Cursors are opaque
+# (base64 encoded) for the client.
+class KeysetPagination(CursorPagination):
+    """Opt-in keyset pagination for list endpoints."""
+    page_size = settings.PAGINATION_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only when client asks for it."""
+        # requests without cursor or page_size return the plain list,
+        # so existing clients keep working
+        params = request.query_params
+        if (self.cursor_query_param not in params and
+                self.page_size_query_param not in params):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipePagination(KeysetPagination):
+    """Keyset pagination for recipes, newest first."""
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """Return ordering of page, search results by rank."""
+        # rank is integer annotation of recipe.search, cursor seeks on it
+        # and ties are resolved by offset
+        if 'rank' in queryset.query.annotations:
+            return ('-rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrPagination(KeysetPagination):
+    """Keyset pagination for tags and ingredients."""
+    ordering = '-name'
+
+    def get_ordering(self, request, queryset, view):
+        """Return ordering of page, popular items by recipe count."""
+        # cursor seeks on the count (HAVING), ties are resolved by offset
+        popular = filters.ATTR_ORDERINGS[filters.ORDER_POPULAR]
+        if tuple(queryset.query.order_by) == popular:
+            return popular
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,39 @@
+"""
+Renderers for the recipe APIs.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render JSON by orjson, same bytes as JSONRenderer."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render compact JSON by orjson, others by the stdlib."""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or data is None or indent is not None or
+                not self.compact or self.ensure_ascii):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # datetimes are passed to the DRF encoder, which formats them
+            # differently than orjson
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            # non string keys, integers over 64 bits...
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # like JSONRenderer, keep output a strict javascript subset
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028',
+        ).replace(
+            '\u2029'.encode(), b'\\u2029',
+        )
@@ -0,0 +1,81 @@
+"""
+Full text search of recipes.
+"""
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import (
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+
+# rank is scaled to integer, so cursor pagination can seek on it exactly
+RANK_SCALE = 1000000
+
+
+def _related_names(relation, field):
+    """Return subquery of space separated names of recipe relation."""
+    Through = getattr(Recipe, relation).through
+    return Subquery(
+        Through.objects.filter(
+            recipe_id=OuterRef('pk'),
+        ).values('recipe_id').annotate(
+            names=StringAgg(f'{field}__name', ' '),
+        ).values('names')
+    )
+
+
+def get_search_vector():
+    """Return expression computing search vector of recipe."""
+    config = settings.RECIPE_SEARCH_CONFIG
+    # matches in title rank highest, then tags, ingredients, description
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(_related_names('tags', 'tag'), weight='B',
+                       config=config)
+        + SearchVector(_related_names('ingredients', 'ingredient'),
+                       weight='C', config=config)
+        + SearchVector('description', weight='D', config=config)
+    )
+
+
+def update_search_vectors(recipes):
+    """Recompute stored search vectors of recipes queryset."""
+    # a single UPDATE, names are aggregated by correlated subqueries
+    recipes.update(search_vector=get_search_vector())
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching search text, ordered by rank."""
+    # web search syntax - "quoted phrases", or, -excluded words
+    query = SearchQuery(
+        text,
+        search_type='websearch',
+        config=settings.RECIPE_SEARCH_CONFIG,
+    )
+    # @@ on stored vector uses the GIN index
+    matches = queryset.filter(search_vector=query)
+    limit = settings.RECIPE_SEARCH_MAX_CANDIDATES
+    if limit:
+        # ranking reads the vector of every match - for common words that
+        # is most of the table. Only the newest matches are ranked
+        matches = queryset.filter(
+            pk__in=matches.order_by('-id').values('pk')[:limit],
+        )
+
+    return matches.annotate(
+        rank=Cast(
+            SearchRank(F('search_vector'), query) * RANK_SCALE,
+            IntegerField(),
+        ),
+    ).order_by('-rank', '-id')
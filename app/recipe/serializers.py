@@ -1,30 +1,63 @@
 """
 Serializers for recipe APIs
 """
+from django.db import transaction
 from rest_framework import serializers
 
+from core import jobs
 from core.models import (
+    ImageJob,
     Tag,
     Recipe,
     Ingredient,
 )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for recipe attributes."""
+    # annotated by recipe.filters.annotate_recipe_count
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    def get_fields(self):
+        """Return fields, recipe count only when requested."""
+        fields = super().get_fields()
+        if not self.context.get('with_counts'):
+            fields.pop('recipe_count')
+
+        return fields
+
+    def validate_name(self, value):
+        """Check renamed attribute does not clash with existing one."""
+        # names are unique per user. Nested in recipes, items are
+        # get or created by name, so only renaming can break uniqueness
+        if self.instance is not None:
+            clash = type(self.instance).objects.filter(
+                user=self.instance.user,
+                name=value,
+            ).exclude(pk=self.instance.pk).exists()
+            if clash:
+                raise serializers.ValidationError(
+                    f'{value} already exists.'
+                )
+
+        return value
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredients."""
 
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tags."""
 
     class Meta:
         model = Tag
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
@@ -32,40 +65,77 @@ class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    # lists show the smallest image variant to cut transferred bytes
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags',
-                  'ingredients']
+                  'ingredients', 'thumbnail']
         read_only_fields = ['id']
 
+    def get_fields(self):
+        """Return fields, only those requested by client if any."""
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested is not None:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested
+            }
+
+        return fields
+
+    def _get_image_url(self, recipe, name):
+        """Return URL of image file, absolute when request is known."""
+        url = recipe.image.storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnail(self, recipe):
+        """Return URL of thumbnail, original image until it is ready."""
+        if not recipe.image:
+            return None
+        name = recipe.image_variants.get('thumb', recipe.image.name)
+        return self._get_image_url(recipe, name)
+
+    def _get_or_create_attrs(self, model, items):
+        """Return tags/ingredients with given names, create missing ones."""
+        auth_user = self.context['request'].user
+        # keep order of items, but skip repeated names
+        names = list(dict.fromkeys(item['name'] for item in items))
+        objs = model.objects.get_or_create_by_names(auth_user, names)
+
+        return [objs[name] for name in names]
+
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            # create tag if does not exist, or take existing
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                # instead of name=tag['name'], use kwargs to secure
-                # this code from update
-                # if more fields would be added in tag in the future
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        tag_objs = self._get_or_create_attrs(Tag, tags)
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            # create tag if does not exist, or take existing
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                # instead of name=tag['name'], use kwargs to secure
-                # this code from update
-                # if more fields would be added in tag in the future
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        """Handle getting or creating ingredients as needed."""
+        ingredient_objs = self._get_or_create_attrs(Ingredient, ingredients)
+        if ingredient_objs:
+            recipe.ingredients.add(*ingredient_objs)
+
+    def _update_attrs(self, relation, model, items):
+        """Update recipe tags/ingredients changing only the difference."""
+        current = dict(relation.values_list('name', 'id'))
+        names = {item['name'] for item in items}
+        removed = [
+            obj_id for name, obj_id in current.items() if name not in names
+        ]
+        added = self._get_or_create_attrs(
+            model, [item for item in items if item['name'] not in current],
+        )
+        # through table rows are touched only for the items which changed.
+        # when the requested set is the same, nothing is written at all
+        if removed:
+            relation.remove(*removed)
+        if added:
+            relation.add(*added)
 
     # provide custom logic to make writable nested serializer
     def create(self, validated_data):
@@ -80,18 +150,17 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update recipe."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         # we want to allow tags can be empty list
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._update_attrs(instance.tags, Tag, tags)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._update_attrs(instance.ingredients, Ingredient, ingredients)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -102,9 +171,20 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerialzer(RecipeSerializer):
     """Serializer for recipe detail view."""
+    images = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
+        fields = RecipeSerializer.Meta.fields + ['description', 'images']
+
+    def get_images(self, recipe):
+        """Return URLs of original image and all generated variants."""
+        if not recipe.image:
+            return {}
+        names = {'original': recipe.image.name, **recipe.image_variants}
+        return {
+            variant: self._get_image_url(recipe, name)
+            for variant, name in names.items()
+        }
 
 
 # create separate serializer for recipe uploading image, because
@@ -119,3 +199,62 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class ImageJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued recipe image processing."""
+    # header is checked on upload, the image is decoded by the worker
+    image = serializers.FileField(write_only=True)
+
+    class Meta:
+        model = ImageJob
+        fields = [
+            'id', 'recipe', 'image', 'status', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'id', 'recipe', 'status', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def create(self, validated_data):
+        """Store image and queue its processing."""
+        return jobs.enqueue_image(
+            validated_data['recipe'], validated_data['image'],
+        )
+
+
+class RangeStatsSerializer(serializers.Serializer):
+    """Serializer for average and range of integer values."""
+    avg = serializers.FloatField(allow_null=True)
+    min = serializers.IntegerField(allow_null=True)
+    max = serializers.IntegerField(allow_null=True)
+
+
+class PriceStatsSerializer(serializers.Serializer):
+    """Serializer for average and range of prices."""
+    avg = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True,
+    )
+    min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True,
+    )
+    max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True,
+    )
+
+
+class UsageSerializer(serializers.Serializer):
+    """Serializer for number of recipes using tag/ingredient."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipes = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """Serializer for aggregated statistics of recipes."""
+    count = serializers.IntegerField()
+    time_minutes = RangeStatsSerializer()
+    price = PriceStatsSerializer()
+    tags = UsageSerializer(many=True)
+    ingredients = UsageSerializer(many=True)
@@ -0,0 +1,116 @@
+"""
+Signal handlers for the recipe app.
+"""
+from django.db.models.signals import (
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import (
+    cache,
+    search,
+)
+
+
+# name of recipe relation for every recipe attribute model
+RECIPE_RELATIONS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+# recipe fields in search vector
+SEARCH_FIELDS = {'title', 'description'}
+
+
+def _touch_recipes(recipes, update_search=True):
+    """Mark recipes as modified, recompute their search vectors."""
+    fields = {'updated_at': timezone.now()}
+    if update_search:
+        fields['search_vector'] = search.get_search_vector()
+    recipes.update(**fields)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Invalidate cached responses of the owner of changed object."""
+    # recipes embed tag and ingredient names, so any write invalidates
+    # all list endpoints of the user
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields, **kwargs):
+    """Recompute search vector of saved recipe."""
+    if update_fields is None or SEARCH_FIELDS.intersection(update_fields):
+        search.update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_of_attr(sender, instance, created, **kwargs):
+    """Mark recipes embedding renamed tag/ingredient modified."""
+    if not created:
+        _touch_recipes(Recipe.objects.filter(
+            **{RECIPE_RELATIONS[sender]: instance}
+        ))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_of_deleted_attr(sender, instance, **kwargs):
+    """Mark recipes embedding deleted tag/ingredient modified."""
+    # through rows are removed without m2m_changed signal. They still
+    # exist here, search vectors are recomputed after delete
+    instance._recipe_ids = list(Recipe.objects.filter(
+        **{RECIPE_RELATIONS[sender]: instance}
+    ).values_list('id', flat=True))
+    _touch_recipes(
+        Recipe.objects.filter(pk__in=instance._recipe_ids),
+        update_search=False,
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_of_deleted_attr(sender, instance, **kwargs):
+    """Recompute search vectors of recipes without deleted tag/ingredient."""
+    search.update_search_vectors(
+        Recipe.objects.filter(pk__in=getattr(instance, '_recipe_ids', [])),
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Handle change of recipe tags/ingredients."""
+    if reverse:
+        # changed from tag/ingredient side - pk_set holds recipe ids
+        if action == 'pre_clear':
+            instance._cleared_recipe_ids = list(
+                instance.recipe_set.values_list('id', flat=True)
+            )
+        elif action == 'post_clear':
+            _touch_recipes(Recipe.objects.filter(
+                pk__in=instance._cleared_recipe_ids,
+            ))
+        elif action in ('post_add', 'post_remove'):
+            _touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        _touch_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.invalidate_user(instance.user_id)
@@ -0,0 +1,61 @@
+"""
+Aggregated statistics of recipes.
+"""
+from django.db.models import (
+    Avg,
+    Count,
+    F,
+    Max,
+    Min,
+)
+
+from core.models import Recipe
+
+
+def _get_usage(recipes, relation, field):
+    """Return number of recipes using each tag/ingredient, most used first."""
+    Through = getattr(Recipe, relation).through
+    # grouped on the through table - the whole usage is one query
+    rows = Through.objects.filter(
+        recipe_id__in=recipes.values('pk'),
+    ).values(
+        f'{field}_id',
+    ).annotate(
+        name=F(f'{field}__name'),
+        recipes=Count('recipe_id'),
+    ).order_by('-recipes', 'name')
+
+    return [
+        {'id': row[f'{field}_id'], 'name': row['name'],
+         'recipes': row['recipes']}
+        for row in rows
+    ]
+
+
+def get_recipe_stats(recipes):
+    """Return statistics of recipes queryset."""
+    totals = recipes.order_by().aggregate(
+        count=Count('id'),
+        time_minutes_avg=Avg('time_minutes'),
+        time_minutes_min=Min('time_minutes'),
+        time_minutes_max=Max('time_minutes'),
+        price_avg=Avg('price'),
+        price_min=Min('price'),
+        price_max=Max('price'),
+    )
+
+    return {
+        'count': totals['count'],
+        'time_minutes': {
+            'avg': totals['time_minutes_avg'],
+            'min': totals['time_minutes_min'],
+            'max': totals['time_minutes_max'],
+        },
+        'price': {
+            'avg': totals['price_avg'],
+            'min': totals['price_min'],
+            'max': totals['price_max'],
+        },
+        'tags': _get_usage(recipes, 'tags', 'tag'),
+        'ingredients': _get_usage(recipes, 'ingredients', 'ingredient'),
+    }
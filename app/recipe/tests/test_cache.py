@@ -0,0 +1,248 @@
+"""
+Tests for caching of recipe API list responses.
+"""
+import threading
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+# tests run in one process, local memory cache is shared by all requests
+@override_settings(RECIPE_CACHE=True)
+class ListCacheTests(TestCase):
+    """Test caching of list endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test repeated list request does not query database."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+
+    def test_query_params_normalized(self):
+        """Test order of filtered ids does not create new cache entry."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPES_URL, {'tags': f'{tag2.id},{tag1.id}'})
+
+    def test_create_invalidates_list(self):
+        """Test creating recipe invalidates cached list."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        create_recipe(user=self.user, title='New recipe')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[0]['title'], 'New recipe')
+
+    def test_tag_change_invalidates_recipe_list(self):
+        """Test renaming tag invalidates recipes embedding it."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegetarian')
+
+    def test_m2m_change_invalidates_list(self):
+        """Test assigning tag to recipe invalidates cached lists."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([t['name'] for t in res.data], ['Vegan'])
+
+    def test_bulk_import_invalidates_list(self):
+        """Test bulk import, which bypasses signals, invalidates list."""
+        self.client.get(RECIPES_URL)
+
+        payload = [{'title': 'Imported', 'time_minutes': 5, 'price': '1.00'}]
+        self.client.post(
+            reverse('recipe:recipe-bulk-import'), payload, format='json',
+        )
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([r['title'] for r in res.data], ['Imported'])
+
+    def test_cache_limited_to_user(self):
+        """Test cached list of one user is not served to other user."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        other_user = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_not_modified(self):
+        """Test matching If-None-Match returns 304 without body."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_not_modified_since(self):
+        """Test list not modified since Last-Modified returns 304."""
+        res = self.client.get(RECIPES_URL)
+        last_modified = res['Last-Modified']
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        """Test stale ETag is answered with full response."""
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 1)
+
+    def test_stats_cached_until_write(self):
+        """Test statistics are cached and invalidated by recipe writes."""
+        create_recipe(user=self.user)
+        self.client.get(STATS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['count'], 1)
+
+        create_recipe(user=self.user)
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 2)
+
+
+# concurrent request reads in other thread and connection, it sees only
+# committed data
+@override_settings(RECIPE_CACHE=True)
+class ListCacheCommitTests(TransactionTestCase):
+    """Test invalidation of lists cached while a write commits."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_cached_before_commit_invalidated(self):
+        """Test list cached by concurrent request is invalidated on commit."""
+        concurrent = []
+
+        def get_list():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                concurrent.append(client.get(RECIPES_URL).data)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            create_recipe(user=self.user, title='Soup')
+            thread = threading.Thread(target=get_list)
+            thread.start()
+            thread.join()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(concurrent, [[]])
+        self.assertEqual([recipe['title'] for recipe in res.data], ['Soup'])
+
+
+@override_settings(RECIPE_CACHE=False)
+class ListCacheDisabledTests(TestCase):
+    """Test lists with caching disabled."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_cached(self):
+        """Test every list request reads database, without validators."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        recipe = Recipe.objects.get(user=self.user)
+        Recipe.objects.filter(id=recipe.id).update(title='Changed')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['title'], 'Changed')
+        self.assertNotIn('ETag', res)
@@ -0,0 +1,146 @@
+"""
+Tests for fast serialization of recipe API lists.
+"""
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+from recipe.renderers import FastJSONRenderer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastJSONRendererTests(TestCase):
+    """Test orjson renderer output matches JSONRenderer."""
+
+    def test_same_bytes(self):
+        """Test rendering data of various types to identical bytes."""
+        data = {
+            'text': 'Crème brûlée \u2028 \u2029 "quoted"',
+            'number': 12,
+            'price': Decimal('1.50'),
+            'none': None,
+            'nested': [{'flag': True}, []],
+            'created': timezone.make_aware(
+                datetime.datetime(2021, 5, 1, 10, 30, 15, 123456),
+                timezone.utc,
+            ),
+            'day': datetime.date(2021, 5, 1),
+            1: 'integer key',
+        }
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data),
+        )
+
+    def test_indent_rendered_by_stdlib(self):
+        """Test pretty printed output matches JSONRenderer."""
+        data = {'items': [1, 2]}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+
+class FastSerializationTests(TestCase):
+    """Test fast path responses are identical to serializer responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick \u2028')
+        salt = Ingredient.objects.create(user=self.user, name='Sól')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i} ñ',
+                time_minutes=i + 1,
+                price=Decimal(f'{i}.50'),
+                link='' if i else 'http://example.com/recipe.pdf',
+            )
+            recipe.tags.add(vegan, quick)
+            recipe.ingredients.add(salt)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/ab/cd/abcd.png',
+            image_variants={'thumb': 'uploads/recipe/ef/gh/efgh.jpg'},
+        )
+
+    def _get_both(self, url, params=None):
+        """Return response content without and with fast path."""
+        contents = []
+        for enabled in [False, True]:
+            # cached lists would hide the difference
+            cache.clear()
+            with override_settings(RECIPE_FAST_SERIALIZATION=enabled):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, 200)
+            contents.append(res.content)
+
+        return contents
+
+    def test_recipe_list(self):
+        """Test recipe list including nested items and thumbnails."""
+        slow, fast = self._get_both(RECIPES_URL)
+
+        self.assertEqual(fast, slow)
+        self.assertIn(b'efgh.jpg', fast)
+
+    def test_recipe_list_paginated(self):
+        """Test paginated and filtered recipe list."""
+        tag = Tag.objects.get(name='Vegan')
+
+        slow, fast = self._get_both(
+            RECIPES_URL, {'page_size': 2, 'tags': tag.id},
+        )
+
+        self.assertEqual(fast, slow)
+
+    def test_recipe_search_paginated(self):
+        """Test rank of searched recipes is available to pagination."""
+        slow, fast = self._get_both(
+            RECIPES_URL, {'search': 'recipe', 'page_size': 2},
+        )
+
+        self.assertEqual(fast, slow)
+        self.assertIn(b'"next":"http', fast)
+
+    def test_recipe_list_query_count(self):
+        """Test fast recipe list does a fixed number of queries."""
+        cache.clear()
+
+        # recipes + tags + ingredients
+        with override_settings(RECIPE_FAST_SERIALIZATION=True), \
+                self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_attr_lists(self):
+        """Test tag and ingredient lists, with counts and ordered."""
+        for url in [TAGS_URL, INGREDIENTS_URL]:
+            for params in [None, {'with_counts': 1, 'ordering': 'popular'}]:
+                slow, fast = self._get_both(url, params)
+                self.assertEqual(fast, slow)
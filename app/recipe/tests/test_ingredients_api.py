@@ -5,7 +5,10 @@ from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import (
+    TestCase,
+    override_settings,
+)
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -14,6 +17,7 @@ from core.models import (
     Ingredient,
     Recipe,
 )
+from recipe import autocomplete
 from recipe.serializers import IngredientSerializer
 
 
@@ -144,3 +148,69 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+
+class IngredientAutocompleteTests(TestCase):
+    """Test autocomplete of ingredient names."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        autocomplete.clear()
+        for name in ['Tomato', 'Tomatillo', 'Potato', 'Basil', 'Tofu']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+    def _complete(self, text, **params):
+        """Return names autocompleted for text."""
+        res = self.client.get(INGREDIENTS_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in res.data]
+
+    def test_prefix_matches_first(self):
+        """Test names starting with text come before similar names."""
+        names = self._complete('tomat')
+
+        self.assertEqual(names[:2], ['Tomato', 'Tomatillo'])
+        self.assertNotIn('Basil', names)
+
+    def test_fuzzy_match(self):
+        """Test misspelled text finds similar names."""
+        self.assertEqual(self._complete('basill'), ['Basil'])
+
+    def test_limit(self):
+        """Test number of results is limited."""
+        self.assertEqual(self._complete('to', limit=1), ['Tomato'])
+
+    def test_invalid_limit(self):
+        """Test non integer limit returns an error."""
+        res = self.client.get(INGREDIENTS_URL, {'q': 'to', 'limit': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limited_to_user(self):
+        """Test only user's ingredients are autocompleted."""
+        other = create_user(email='other@example.com')
+        Ingredient.objects.create(user=other, name='Tomato paste')
+
+        self.assertNotIn('Tomato paste', self._complete('tomato'))
+
+    @override_settings(AUTOCOMPLETE_CACHE=True)
+    def test_cached_results_invalidated_on_write(self):
+        """Test cached results are served until user changes data."""
+        self._complete('tofu')
+        with self.assertNumQueries(0):
+            self.assertEqual(self._complete('TOFU'), ['Tofu'])
+
+        Ingredient.objects.create(user=self.user, name='Tofu skin')
+
+        self.assertEqual(self._complete('tofu'), ['Tofu', 'Tofu skin'])
+
+    @override_settings(AUTOCOMPLETE_CACHE=False)
+    def test_cache_disabled(self):
+        """Test results are queried every time when caching is disabled."""
+        self._complete('tofu')
+
+        Ingredient.objects.filter(name='Tofu').update(name='Tofu skin')
+
+        self.assertEqual(self._complete('tofu'), ['Tofu skin'])
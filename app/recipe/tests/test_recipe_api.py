@@ -2,19 +2,29 @@
 Test for recipe APIs.
 """
 from decimal import Decimal
+import json
 import tempfile
 import os
+from io import StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    ImageJob,
     Recipe,
     Tag,
     Ingredient,
@@ -24,9 +34,13 @@ from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerialzer,
 )
+from recipe.pagination import RecipePagination
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+STATS_URL = reverse('recipe:recipe-stats')
 
 
 def detail_url(recipe_id):
@@ -39,6 +53,11 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def image_job_url(job_id):
+    """Create and return an image job status URL."""
+    return reverse('recipe:imagejob-detail', args=[job_id])
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe. params is a dict"""
     defaults = {
@@ -303,6 +322,46 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_update_recipe_keeps_unchanged_tags(self):
+        """Test updating tags only changes the difference."""
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag_keep, tag_drop)
+        RecipeTag = Recipe.tags.through
+        kept_row = RecipeTag.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = set(recipe.tags.values_list('name', flat=True))
+        self.assertEqual(names, {'Keep', 'New'})
+        # the through row of unchanged tag was not rewritten
+        self.assertTrue(RecipeTag.objects.filter(id=kept_row.id).exists())
+
+    def test_update_recipe_same_tags_skips_writes(self):
+        """Test updating recipe with unchanged tags does not write them."""
+        tag = Tag.objects.create(user=self.user, name='Same')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        payload = {'tags': [{'name': 'Same'}]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through_table = Recipe.tags.through._meta.db_table
+        writes = [
+            q['sql'] for q in ctx.captured_queries
+            if through_table in q['sql'] and
+            q['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
     def test_create_recipe_with_new_ingredients(self):
         """Test creating a recipe with new ingredients."""
         payload = {
@@ -433,6 +492,670 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes matching all given tags."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        r1 = create_recipe(user=self.user, title='Vegan Quick Salad')
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title='Vegan Stew')
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_results_unique(self):
+        """Test recipe matching many filter ids is returned once."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+    def test_filter_invalid_match(self):
+        """Test invalid match mode returns an error."""
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        """Return ids of recipes found by text."""
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_search_ranks_title_first(self):
+        """Test title matches rank above description matches."""
+        in_description = create_recipe(
+            user=self.user, title='Soup', description='Tomatoes and basil',
+        )
+        in_title = create_recipe(
+            user=self.user, title='Tomato salad', description='Fresh',
+        )
+        create_recipe(user=self.user, title='Porridge', description='Oats')
+
+        self.assertEqual(
+            self._search('tomato'), [in_title.id, in_description.id],
+        )
+
+    def test_search_tags_and_ingredients(self):
+        """Test recipes are found by names of tags and ingredients."""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': Decimal('4.50'),
+            'tags': [{'name': 'Vegan'}],
+            'ingredients': [{'name': 'Chickpeas'}],
+        }
+        recipe_id = self.client.post(
+            RECIPES_URL, payload, format='json',
+        ).data['id']
+        create_recipe(user=self.user, title='Steak')
+
+        self.assertEqual(self._search('vegan'), [recipe_id])
+        self.assertEqual(self._search('chickpea'), [recipe_id])
+
+    def test_search_follows_tag_changes(self):
+        """Test renamed and deleted tags update search results."""
+        recipe = create_recipe(user=self.user, title='Pancakes')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+        self.assertEqual(self._search('breakfast'), [recipe.id])
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self._search('breakfast'), [])
+        self.assertEqual(self._search('brunch'), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self._search('brunch'), [])
+
+    def test_search_bulk_imported(self):
+        """Test bulk imported recipes are searchable."""
+        payload = [{
+            'title': 'Lasagne',
+            'time_minutes': 60,
+            'price': '12.00',
+            'tags': [{'name': 'Italian'}],
+        }]
+        self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(len(self._search('italian lasagne')), 1)
+
+    def test_search_limited_to_user(self):
+        """Test search returns only recipes of authenticated user."""
+        other = create_user(email='other@example.com', password='pass123')
+        create_recipe(user=other, title='Tomato soup')
+
+        self.assertEqual(self._search('tomato'), [])
+
+    @override_settings(RECIPE_SEARCH_MAX_CANDIDATES=2)
+    def test_search_ranks_newest_candidates(self):
+        """Test only the newest matches are ranked."""
+        create_recipe(user=self.user, title='Rice', description='Rice')
+        newer = [
+            create_recipe(user=self.user, title='Cake', description='Rice')
+            for _ in range(2)
+        ]
+
+        self.assertEqual(self._search('rice'), [newer[1].id, newer[0].id])
+
+    def test_search_ranks_all_matches_by_default(self):
+        """Test older recipe with higher rank is returned first."""
+        best = create_recipe(user=self.user, title='Rice', description='Rice')
+        newer = [
+            create_recipe(user=self.user, title='Cake', description='Rice')
+            for _ in range(2)
+        ]
+
+        self.assertEqual(
+            self._search('rice'), [best.id, newer[1].id, newer[0].id],
+        )
+
+    def test_search_paginated_by_rank(self):
+        """Test cursor pages of search results keep rank order."""
+        recipes = [
+            create_recipe(user=self.user, title='Fish', description='Rice'),
+            create_recipe(user=self.user, title='Rice', description='Fish'),
+            create_recipe(user=self.user, title='Cake', description='Rice'),
+        ]
+        expected = self._search('rice')
+
+        res = self.client.get(RECIPES_URL, {'search': 'rice', 'page_size': 1})
+        ids = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(expected[0], recipes[1].id)
+        self.assertEqual(ids, expected)
+
+
+class RecipeStatsTests(TestCase):
+    """Test aggregated statistics of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_stats_empty(self):
+        """Test statistics of user without recipes."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 0)
+        self.assertIsNone(res.data['price']['avg'])
+        self.assertEqual(res.data['tags'], [])
+
+    def test_stats(self):
+        """Test counts, averages and ranges of user's recipes."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        r1 = create_recipe(
+            user=self.user, time_minutes=10, price=Decimal('2.00'))
+        r2 = create_recipe(
+            user=self.user, time_minutes=20, price=Decimal('5.00'))
+        create_recipe(user=self.user, time_minutes=60, price=Decimal('8.50'))
+        r1.tags.add(vegan, quick)
+        r2.tags.add(vegan)
+        r2.ingredients.add(salt)
+        other_user = create_user(
+            email='other@example.com', password='testpass123')
+        create_recipe(user=other_user, price=Decimal('99.00'))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(
+            res.data['time_minutes'], {'avg': 30.0, 'min': 10, 'max': 60})
+        self.assertEqual(
+            res.data['price'], {'avg': '5.17', 'min': '2.00', 'max': '8.50'})
+        self.assertEqual(res.data['tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'recipes': 2},
+            {'id': quick.id, 'name': 'Quick', 'recipes': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': salt.id, 'name': 'Salt', 'recipes': 1},
+        ])
+
+    def test_stats_filtered_by_tags(self):
+        """Test statistics use the same filters as the list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user, price=Decimal('3.00'))
+        recipe.tags.add(tag)
+        create_recipe(user=self.user, price=Decimal('9.00'))
+
+        res = self.client.get(STATS_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['price']['max'], '3.00')
+
+    def test_stats_invalid_match(self):
+        """Test invalid match mode returns an error."""
+        res = self.client.get(STATS_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_query_count_independent_of_size(self):
+        """Test statistics are aggregated in database."""
+        for i in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}'))
+
+        # totals + tag usage + ingredient usage
+        with self.assertNumQueries(3):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(len(res.data['tags']), 5)
+
+
+class RecipeFieldsTests(TestCase):
+    """Test sparse fieldsets and expansion of recipe responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_list_only_requested_fields(self):
+        """Test list returns requested fields without prefetching."""
+        # only the recipes query, no prefetch of tags and ingredients
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+
+    def test_list_reads_only_rendered_columns(self):
+        """Test list does not read columns which are not rendered."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"search_vector"', sql)
+
+    def test_default_fields_skip_search_vector(self):
+        """Test detail, update and export do not read search vector."""
+        url = detail_url(self.recipe.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+            self.client.patch(url, {'title': 'Changed'})
+            b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(any('"core_recipe"' in sql for sql in selects))
+        for sql in selects:
+            self.assertNotIn('"search_vector"', sql)
+        # vector of updated recipe is maintained anyway
+        res = self.client.get(RECIPES_URL, {'search': 'changed'})
+        self.assertEqual([item['id'] for item in res.data], [self.recipe.id])
+
+    def test_list_expand_detail_fields(self):
+        """Test expand adds detail fields to the default list fields."""
+        res = self.client.get(RECIPES_URL, {'expand': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['description'], 'Sample description')
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegan')
+        self.assertNotIn('images', res.data[0])
+
+    def test_retrieve_only_requested_fields(self):
+        """Test detail returns requested fields with own ETag."""
+        url = detail_url(self.recipe.id)
+        full = self.client.get(url)
+
+        res = self.client.get(url, {'fields': 'title,description'})
+
+        self.assertEqual(res.data, {
+            'title': self.recipe.title,
+            'description': self.recipe.description,
+        })
+        self.assertNotEqual(res['ETag'], full['ETag'])
+        res = self.client.get(
+            url, {'fields': 'title,description'},
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_field_error(self):
+        """Test requesting unknown field returns an error."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalRequestTests(TestCase):
+    """Test conditional GET of recipe detail."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_detail_validators(self):
+        """Test detail response contains ETag and Last-Modified."""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_detail_not_modified_etag(self):
+        """Test matching If-None-Match skips serializing recipe."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        # only the recipe row is fetched
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_detail_not_modified_since(self):
+        """Test If-Modified-Since not older than recipe returns 304."""
+        url = detail_url(self.recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_after_tag_added(self):
+        """Test adding tag to recipe changes its ETag."""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='New'))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'New')
+
+    def test_tag_rename_touches_recipe(self):
+        """Test renaming tag updates modification time of its recipes."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.recipe.tags.add(tag)
+        self.recipe.refresh_from_db()
+        updated_at = self.recipe.updated_at
+
+        tag.name = 'Renamed'
+        tag.save()
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipe list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_paginated_by_default(self):
+        """Test list without pagination params returns all recipes."""
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+
+    def test_paginate_recipes(self):
+        """Test walking through pages of recipes with cursors."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        expected_ids = [r.id for r in reversed(recipes)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        ids = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(ids, expected_ids)
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_page_size_capped(self):
+        """Test requested page size is limited by max page size."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipePagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+
+class RecipeQueryBudgetTests(TestCase):
+    """Test recipe endpoints run a fixed number of queries."""
+
+    # 1 query for recipes + 1 prefetch for tags + 1 for ingredients
+    LIST_QUERIES = 3
+    DETAIL_QUERIES = 3
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        """Create recipes each with own tags and ingredients."""
+        recipes = []
+        for _ in range(count):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}a'),
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}b'),
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    user=self.user, name=f'Ingredient {recipe.id}',
+                ),
+            )
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_query_count_independent_of_size(self):
+        """Test listing recipes does not issue queries per recipe."""
+        self._create_recipes(2)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 2)
+
+        self._create_recipes(10)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 12)
+
+    def test_filtered_list_query_count(self):
+        """Test filtering recipes does not issue queries per recipe."""
+        recipes = self._create_recipes(10)
+        tag_ids = [r.tags.first().id for r in recipes]
+        ingredient_ids = [r.ingredients.first().id for r in recipes]
+        params = {
+            'tags': ','.join(str(i) for i in tag_ids),
+            'ingredients': ','.join(str(i) for i in ingredient_ids),
+        }
+
+        with self.assertNumQueries(self.LIST_QUERIES):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe issues a fixed number of queries."""
+        recipe = self._create_recipes(1)[0]
+
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+    def _count_queries(self, func):
+        """Return number of queries run by func."""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def _nested_payload(self, prefix, count):
+        """Return payload with count new and existing tags/ingredients."""
+        for i in range(count):
+            Tag.objects.create(user=self.user, name=f'{prefix} old tag {i}')
+            Ingredient.objects.create(
+                user=self.user, name=f'{prefix} old ingredient {i}',
+            )
+        return {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+            'tags': [{'name': f'{prefix} {age} tag {i}'}
+                     for age in ('old', 'new') for i in range(count)],
+            'ingredients': [{'name': f'{prefix} {age} ingredient {i}'}
+                            for age in ('old', 'new') for i in range(count)],
+        }
+
+    def test_create_query_count_independent_of_nested_items(self):
+        """Test creating recipe does not run queries per nested item."""
+        small = self._nested_payload('small', 1)
+        large = self._nested_payload('large', 15)
+
+        small_count = self._count_queries(
+            lambda: self.client.post(RECIPES_URL, small, format='json')
+        )
+        large_count = self._count_queries(
+            lambda: self.client.post(RECIPES_URL, large, format='json')
+        )
+
+        self.assertEqual(small_count, large_count)
+        recipe = Recipe.objects.get(tags__name='large new tag 0')
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+    def test_update_query_count_independent_of_nested_items(self):
+        """Test updating recipe does not run queries per nested item."""
+        recipe = create_recipe(user=self.user)
+        # both updates below replace some existing items
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Initial'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Initial'),
+        )
+        url = detail_url(recipe.id)
+        small = self._nested_payload('small', 1)
+        large = self._nested_payload('large', 15)
+
+        small_count = self._count_queries(
+            lambda: self.client.put(url, small, format='json')
+        )
+        large_count = self._count_queries(
+            lambda: self.client.put(url, large, format='json')
+        )
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+
+class BulkRecipeAPITests(TestCase):
+    """Test bulk import and export of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '2.50',
+                'tags': [{'name': 'Shared'}, {'name': f'Tag {i}'}],
+                'ingredients': [{'name': 'Salt'}],
+            } for i in range(3)
+        ]
+
+    def test_bulk_import_json(self):
+        """Test importing recipes from JSON array."""
+        res = self.client.post(BULK_URL, self.recipes, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [r.title for r in recipes], ['Recipe 0', 'Recipe 1', 'Recipe 2'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(
+            set(recipes[1].tags.values_list('name', flat=True)),
+            {'Shared', 'Tag 1'},
+        )
+        self.assertEqual(recipes[2].ingredients.get().name, 'Salt')
+
+    def test_bulk_import_ndjson(self):
+        """Test importing recipes from NDJSON body."""
+        body = '\n'.join(json.dumps(r) for r in self.recipes) + '\n'
+
+        res = self.client.post(
+            BULK_URL, body, content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_import_chunks(self):
+        """Test importing more recipes than fit in one chunk."""
+        with patch('recipe.bulk.IMPORT_CHUNK_SIZE', 2):
+            res = self.client.post(BULK_URL, self.recipes, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_import_invalid_creates_nothing(self):
+        """Test invalid recipe in payload rejects the whole import."""
+        self.recipes[1].pop('title')
+
+        res = self.client.post(BULK_URL, self.recipes, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_import_invalid_ndjson(self):
+        """Test malformed NDJSON line returns an error."""
+        res = self.client.post(
+            BULK_URL, '{"title": \n', content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes of user as NDJSON."""
+        self.client.post(BULK_URL, self.recipes, format='json')
+        other_user = create_user(
+            email='other@example.com', password='password123')
+        create_recipe(user=other_user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        ids = list(
+            Recipe.objects.filter(user=self.user).order_by('-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual([recipe['id'] for recipe in exported], ids)
+        # nested tags and ingredients are ordered like in detail responses
+        details = [
+            self.client.get(detail_url(recipe_id)).data for recipe_id in ids
+        ]
+        self.assertEqual(exported, json.loads(json.dumps(details)))
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
@@ -447,8 +1170,29 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_variants.values():
+            self.recipe.image.storage.delete(name)
+        for job in ImageJob.objects.all():
+            job.image.storage.delete(job.image.name)
         self.recipe.image.delete()
 
+    def _post_image(self, size=(10, 10), url=None):
+        """Post JPEG image of size to recipe."""
+        url = url or image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size)
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                url, {'image': image_file}, format='multipart',
+            )
+
+    def _upload_image(self, size=(10, 10), url=None):
+        """Upload JPEG image of size to recipe, check it is reported."""
+        with self.assertLogs('core.uploads', 'INFO'):
+            return self._post_image(size=size, url=url)
+
     def test_upload_image(self):
         """Test uploading an image to a recipe."""
         url = image_upload_url(self.recipe.id)
@@ -464,7 +1208,8 @@ class ImageUploadTests(TestCase):
             image_file.seek(0)
             payload = {'image': image_file}
             # best practice for uploading image is using multipart format data
-            res = self.client.post(url, payload, format='multipart')
+            with self.assertLogs('core.uploads', 'INFO'):
+                res = self.client.post(url, payload, format='multipart')
 
         self.recipe.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -480,3 +1225,187 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_VARIANTS_SYNC=True, IMAGE_VARIANT_FORMAT='JPEG')
+    def test_upload_image_generates_variants(self):
+        """Test resized variants are generated after upload."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload_image(size=(1000, 500))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        expected_sizes = {
+            'thumb': (150, 75),
+            'medium': (600, 300),
+            'large': (1000, 500),
+        }
+        self.assertEqual(self.recipe.image_variants.keys(),
+                         expected_sizes.keys())
+        for variant, size in expected_sizes.items():
+            path = self.recipe.image.storage.path(
+                self.recipe.image_variants[variant]
+            )
+            with Image.open(path) as img:
+                self.assertEqual(img.size, size)
+
+    @override_settings(IMAGE_VARIANTS_SYNC=True)
+    def test_variant_urls_in_responses(self):
+        """Test list shows thumbnail and detail shows all variants."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload_image()
+        self.recipe.refresh_from_db()
+        thumb = self.recipe.image_variants['thumb']
+
+        list_res = self.client.get(RECIPES_URL)
+        detail_res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(list_res.data[0]['thumbnail'].endswith(thumb))
+        images_data = detail_res.data['images']
+        self.assertEqual(
+            set(images_data), {'original', 'thumb', 'medium', 'large'},
+        )
+        self.assertTrue(
+            images_data['original'].endswith(self.recipe.image.name)
+        )
+
+    def test_thumbnail_falls_back_to_original(self):
+        """Test original image is shown until variants are ready."""
+        self._upload_image()
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertTrue(
+            res.data[0]['thumbnail'].endswith(self.recipe.image.name)
+        )
+
+    def test_upload_not_image_signature(self):
+        """Test file without image signature is rejected early."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image_file.write(b'not an image at all')
+            image_file.seek(0)
+            res = self.client.post(
+                url, {'image': image_file}, format='multipart',
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_webp_signature_requires_riff(self):
+        """Test WEBP form type without RIFF container is rejected."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.webp') as image_file:
+            image_file.write(b'XXXX\x00\x00\x00\x00WEBPVP8 not an image')
+            image_file.seek(0)
+            res = self.client.post(
+                url, {'image': image_file}, format='multipart',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('WebP', str(res.data['image']))
+
+    def test_upload_logs_rss_change(self):
+        """Test upload reports memory used while it was received."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.assertLogs('core.uploads', 'INFO') as logs:
+                self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                )
+
+        self.assertRegex(logs.output[0], r'RSS change [+-]\d+ KiB')
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_upload_image_too_large(self):
+        """Test image larger than the limit is rejected."""
+        res = self._post_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('larger than 100 bytes', res.data['image'][0])
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_upload_rejected_by_content_length(self):
+        """Test too large request body is rejected before it is read."""
+        with patch('core.uploads.MULTIPART_OVERHEAD', 0), \
+                patch('core.uploads.ImageUploadHandler.receive_data_chunk') \
+                as receive:
+            res = self._post_image()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('larger than 100 bytes', res.data['image'][0])
+        receive.assert_not_called()
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+    def test_upload_image_too_many_pixels(self):
+        """Test image with too many pixels is rejected."""
+        res = self._post_image(size=(10, 10))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('10x10', res.data['image'][0])
+        self.assertFalse(self.recipe.image)
+
+    def test_async_upload_queues_job(self):
+        """Test async upload returns job without changing recipe."""
+        url = image_upload_url(self.recipe.id) + '?async=true'
+        res = self._upload_image(url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = ImageJob.objects.get(id=res.data['id'])
+        self.assertEqual(job.recipe, self.recipe)
+        self.assertEqual(res.data['status'], ImageJob.PENDING)
+        self.assertTrue(res['Location'].endswith(image_job_url(job.id)))
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_async_upload_processed_by_worker(self):
+        """Test worker sets queued image and variants of recipe."""
+        url = image_upload_url(self.recipe.id) + '?async=true'
+        job_id = self._upload_image(url=url).data['id']
+
+        # test runs in a transaction, keep its connection open
+        with patch('core.management.commands.process_image_jobs.'
+                   'close_old_connections'):
+            call_command('process_image_jobs', '--once', stdout=StringIO())
+        res = self.client.get(image_job_url(job_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], ImageJob.DONE)
+        self.assertIsNotNone(res.data['finished_at'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.image.name, ImageJob.objects.get().image.name,
+        )
+        self.assertEqual(
+            set(self.recipe.image_variants), {'thumb', 'medium', 'large'},
+        )
+
+    def test_async_upload_invalid_image(self):
+        """Test async upload checks the image before queueing it."""
+        url = image_upload_url(self.recipe.id) + '?async=true'
+        res = self.client.post(
+            url, {'image': 'notanimage'}, format='multipart',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_image_job_of_other_user(self):
+        """Test status of other user's job is not found."""
+        url = image_upload_url(self.recipe.id) + '?async=true'
+        job_id = self._upload_image(url=url).data['id']
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'password123',
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(image_job_url(job_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,93 @@
+"""
+Tests for reading recipe APIs from replica databases.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+REPLICA = 'replica'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaReadTests(TestCase):
+    """Test safe requests read from replica, unless user just wrote."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # second connection to the test database stands in for replica.
+        # it is outside of the test transaction, so it does not see data
+        # created by tests - reads from it return nothing
+        connections.databases[REPLICA] = {
+            **connections['default'].settings_dict,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        routers._lag_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+        )
+
+    def test_list_read_from_replica(self):
+        """Test list is read from replica."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_export_read_from_replica(self):
+        """Test streamed export is read from replica too."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), b'')
+
+    def test_user_reads_own_write(self):
+        """Test user is pinned to primary after write."""
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+    @patch('core.routers.get_lag', return_value=10.0)
+    def test_lagging_replica_falls_back_to_primary(self, patched_lag):
+        """Test list is read from primary when replica lags behind."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
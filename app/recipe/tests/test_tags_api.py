@@ -64,6 +64,20 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_paginate_tags(self):
+        """Test paginating tags with cursors ordered by name."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [t['name'] for t in res.data['results']]
+        self.assertEqual(names, ['Cherry', 'Banana'])
+        res = self.client.get(res.data['next'])
+        self.assertEqual([t['name'] for t in res.data['results']], ['Apple'])
+        self.assertIsNone(res.data['next'])
+
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to authenticated user."""
         user2 = create_user(email='user2@example.com')
@@ -89,6 +103,18 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing name returns an error."""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='After Dinner')
+
+        url = detail_url(tag.id)
+        res = self.client.patch(url, {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'After Dinner')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -140,3 +166,97 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_tags_with_counts(self):
+        """Test listing tags with number of recipes using them."""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ['Pancakes', 'Porridge']:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal('5.00'),
+                user=self.user,
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': tag2.id, 'name': 'Lunch', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_list_tags_assigned_with_counts(self):
+        """Test assigned_only answered by counts returns unique tags."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Dinner')
+        for title in ['Pancakes', 'Porridge']:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal('5.00'),
+                user=self.user,
+            )
+            recipe.tags.add(tag)
+
+        res = self.client.get(
+            TAGS_URL, {'assigned_only': 1, 'with_counts': 1},
+        )
+
+        self.assertEqual(res.data, [
+            {'id': tag.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_list_tags_by_popularity(self):
+        """Test ordering tags by number of recipes, paginated."""
+        unused = Tag.objects.create(user=self.user, name='Unused')
+        rare = Tag.objects.create(user=self.user, name='Rare')
+        popular = Tag.objects.create(user=self.user, name='Popular')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('5.00'),
+                user=self.user,
+            )
+            recipe.tags.add(popular)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'popular'})
+        self.assertEqual(
+            [t['id'] for t in res.data], [popular.id, rare.id, unused.id],
+        )
+
+        ids = []
+        url, params = TAGS_URL, {'ordering': 'popular', 'page_size': 2}
+        while url:
+            res = self.client.get(url, params)
+            ids.extend(t['id'] for t in res.data['results'])
+            url, params = res.data['next'], None
+        self.assertEqual(ids, [popular.id, rare.id, unused.id])
+
+    def test_list_tags_invalid_ordering(self):
+        """Test unknown ordering returns an error."""
+        res = self.client.get(TAGS_URL, {'ordering': 'oldest'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_tags(self):
+        """Test autocompleting assigned tags by prefix."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=self.user, name='Dinner party')
+        Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = Recipe.objects.create(
+            title='Steak',
+            time_minutes=20,
+            price=Decimal('12.00'),
+            user=self.user,
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'q': 'din', 'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['name'] for t in res.data], ['Dinner'])
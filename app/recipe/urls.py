@@ -17,6 +17,7 @@ router = DefaultRouter()
 router.register('recipes', views.RecipeViewset)
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
+router.register('image-jobs', views.ImageJobViewSet)
 
 app_name = 'recipe'
 
@@ -1,6 +1,21 @@
 """
 Views for the recipe APIs.
 """
+import contextlib
+import hashlib
+
+from django.conf import settings
+from django.db.models import (
+    Prefetch,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,16 +28,164 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAuthenticated,
+)
 
+from core import (
+    images,
+    routers,
+)
+from core.authentication import CachedTokenAuthentication
 from core.models import (
+    ImageJob,
     Recipe,
     Tag,
     Ingredient,
 )
-from recipe import serializers
+from core.uploads import ImageUploadHandler
+from recipe import (
+    autocomplete,
+    bulk,
+    cache,
+    fastpath,
+    filters,
+    search,
+    serializers,
+    stats,
+)
+from recipe.pagination import (
+    RecipePagination,
+    RecipeAttrPagination,
+)
+from recipe.parsers import NDJSONParser
+from recipe.renderers import FastJSONRenderer
+
+
+def conditional_response(request, etag, last_modified, get_response):
+    """Return 304 response if client copy is fresh, else new response."""
+    # get_conditional_response follows RFC 7232 - If-None-Match takes
+    # precedence over If-Modified-Since
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified,
+    )
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # response depends on the authenticated user
+    patch_vary_headers(response, ['Authorization'])
+
+    return response
+
+
+class ReplicaReadMixin:
+    """Read from replica on safe requests, pin writing user to primary."""
+    # replica read by safe request, None for primary
+    read_database = None
+
+    def initial(self, request, *args, **kwargs):
+        """Route reads of safe request to replica."""
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            # user is known only after authentication
+            self._replica_reads = contextlib.ExitStack()
+            self.read_database = self._replica_reads.enter_context(
+                routers.replica_reads(request.user.id)
+            )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Route reads back to primary, pin user after write."""
+        replica_reads = getattr(self, '_replica_reads', None)
+        if replica_reads is not None:
+            replica_reads.close()
+        elif request.method not in SAFE_METHODS and response.status_code < 400:
+            routers.pin_to_primary(request.user.id)
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedListMixin:
+    """Cache list responses per user and answer conditional requests."""
+
+    def list(self, request, *args, **kwargs):
+        """Return list of user's objects, cached until user writes."""
+        if not settings.RECIPE_CACHE:
+            return super().list(request, *args, **kwargs)
+
+        key = cache.get_list_key(request, self.basename)
+
+        def get_response():
+            data = cache.get_data(key)
+            if data is None:
+                data = super(CachedListMixin, self).list(
+                    request, *args, **kwargs
+                ).data
+                cache.set_data(key, data)
+            return Response(data)
+
+        # when client has up to date copy, skip querying and rendering
+        return conditional_response(
+            request,
+            etag=cache.get_etag(key),
+            last_modified=cache.get_last_modified(request.user.id),
+            get_response=get_response,
+        )
+
+
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of recipe fields to return, '
+                    'others are neither read nor rendered.',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of detail fields (description, '
+                    'images) to add to the listed recipes.',
+    ),
+]
+
+
+class FastListMixin:
+    """Serialize lists from values() rows when fast serialization is on."""
+
+    def get_renderers(self):
+        """Return renderers, JSON rendered by orjson on fast path."""
+        renderers = super().get_renderers()
+        if not settings.RECIPE_FAST_SERIALIZATION:
+            return renderers
+
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer
+            else renderer
+            for renderer in renderers
+        ]
+
+    def list(self, request, *args, **kwargs):
+        """Return list of objects, without model serializers if enabled."""
+        if not (settings.RECIPE_FAST_SERIALIZATION and
+                self.can_list_fast()):
+            return super().list(request, *args, **kwargs)
+
+        # cursor pagination reads position from dict rows as well
+        rows = self.get_list_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(page))
+
+        return Response(self.serialize_rows(rows))
+
+    def can_list_fast(self):
+        """Return whether requested representation has a fast path."""
+        return True
 
 
 # extend swagger doc of Recipe list view endpoint
@@ -39,44 +202,220 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Match recipes with any (default) or all of '
+                            'the given tags/ingredients.',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full text search in title, description, tag '
+                            'and ingredient names. Results are ordered by '
+                            'relevance. When the server limits ranked '
+                            'candidates, only the newest matches are '
+                            'ranked and returned.',
+            ),
+            *FIELDS_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=FIELDS_PARAMETERS),
 )
-class RecipeViewset(viewsets.ModelViewSet):
+class RecipeViewset(ReplicaReadMixin,
+                    CachedListMixin,
+                    FastListMixin,
+                    viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerialzer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipePagination
+    # actions which serialize nested tags and ingredients
+    # retrieve prefetches on its own, after checking client copy is stale
+    PREFETCH_ACTIONS = ('list', 'update', 'partial_update')
+    # actions which may return only fields requested by client
+    SPARSE_ACTIONS = ('list', 'retrieve')
+    # model columns read by serialized fields, relations are prefetched
+    FIELD_COLUMNS = {
+        'thumbnail': ['image', 'image_variants'],
+        'images': ['image', 'image_variants'],
+        'tags': [],
+        'ingredients': [],
+    }
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integeres."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _params_to_names(self, qs):
+        """Convert a comma separated list to names, skip empty ones."""
+        return [name.strip() for name in qs.split(',') if name.strip()]
+
+    def _get_fields(self):
+        """Return names of fields requested by client, None for default."""
+        params = self.request.query_params
+        if (self.action not in self.SPARSE_ACTIONS or
+                ('fields' not in params and 'expand' not in params)):
+            return None
+
+        available = serializers.RecipeDetailSerialzer.Meta.fields
+        if 'fields' in params:
+            fields = self._params_to_names(params['fields'])
+        elif self.action == 'list':
+            fields = list(serializers.RecipeSerializer.Meta.fields)
+        else:
+            fields = list(available)
+        fields += self._params_to_names(params.get('expand', ''))
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(unknown)}.'}
+            )
+
+        return sorted(set(fields))
+
+    def _get_columns(self, fields):
+        """Return model columns needed to render fields."""
+        columns = {'id'}
+        for name in fields:
+            columns.update(self.FIELD_COLUMNS.get(name, [name]))
+        if self.action == 'retrieve':
+            # validators of conditional requests
+            columns.add('updated_at')
+
+        return sorted(columns)
+
     # add additional logic for processing queryset which is returned by api
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
-        # -id means in reverse order
+        queryset = self._get_filtered_queryset()
+        text = self.request.query_params.get('search')
+        if text:
+            queryset = search.search_recipes(queryset, text)
+        else:
+            # -id means in reverse order
+            queryset = queryset.order_by('-id')
+
+        fields = self._get_fields()
+        if fields is None and self.action == 'list':
+            fields = serializers.RecipeSerializer.Meta.fields
+        if fields is not None:
+            # unrendered columns (description, search vector) are not read
+            queryset = queryset.only(*self._get_columns(fields))
+        else:
+            # search vector is used by SQL only (filter, rank), not rendered
+            queryset = queryset.defer('search_vector')
+
+        return self._prefetch_for_action(queryset)
+
+    def _get_filtered_queryset(self):
+        """Return user's recipes filtered by tags and ingredients."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        # distinct same as sql - remove duplicates. Duplicates may occur
-        # if multiple recipes assigned to the same tag or ingredient
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_CHOICES:
+            choices = ', '.join(filters.MATCH_CHOICES)
+            raise ValidationError({'match': f'Must be one of: {choices}.'})
+
+        # filters are compiled into EXISTS subqueries, so recipes are not
+        # duplicated and DISTINCT is not required
+        queryset = filters.filter_recipes(
+            self.queryset.filter(user=self.request.user),
+            tag_ids=self._params_to_ints(tags) if tags else None,
+            ingredient_ids=(
+                self._params_to_ints(ingredients) if ingredients else None
+            ),
+            match=match,
+        )
+
+        return queryset
+
+    def _get_prefetches(self):
+        """Return prefetches of nested relations rendered for recipe."""
+        # ordered by name, like recipe.fastpath
+        prefetches = {
+            'tags': Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name').order_by(
+                    'name', 'id',
+                ),
+            ),
+            'ingredients': Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id', 'name').order_by(
+                    'name', 'id',
+                ),
+            ),
+        }
+        # relations which are not rendered are not fetched at all
+        fields = self._get_fields()
+        if fields is not None:
+            return [
+                prefetch for name, prefetch in prefetches.items()
+                if name in fields
+            ]
+
+        return list(prefetches.values())
+
+    def can_list_fast(self):
+        """Return whether default list fields are requested."""
+        return self._get_fields() is None
+
+    def get_list_rows(self, queryset):
+        """Return values() rows of listed recipes."""
+        return fastpath.get_recipe_rows(queryset)
+
+    def serialize_rows(self, rows):
+        """Return recipe rows in RecipeSerializer format."""
+        return fastpath.serialize_recipes(rows, self.request)
+
+    def _prefetch_for_action(self, queryset):
+        """Prefetch nested relations needed by the action serializer."""
+        # without prefetching, the nested tag and ingredient serializers
+        # run 2 extra queries for every recipe in the response (N+1).
+        # upload_image does not render nested objects, so skip it there
+        if self.action not in self.PREFETCH_ACTIONS:
+            return queryset
+
+        return queryset.prefetch_related(*self._get_prefetches())
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return recipe, or 304 if client copy is up to date."""
+        instance = self.get_object()
+
+        def get_response():
+            prefetch_related_objects([instance], *self._get_prefetches())
+            return Response(self.get_serializer(instance).data)
+
+        updated_at = instance.updated_at
+        etag = f'{instance.id}-{updated_at.timestamp()}'
+        fields = self._get_fields()
+        if fields is not None:
+            # sparse representation is a different entity
+            digest = hashlib.md5(','.join(fields).encode()).hexdigest()
+            etag = f'{etag}-{digest[:8]}'
+        return conditional_response(
+            request,
+            etag=f'"{etag}"',
+            last_modified=int(updated_at.timestamp()),
+            get_response=get_response,
+        )
+
+    def get_serializer_context(self):
+        """Pass fields requested by client."""
+        context = super().get_serializer_context()
+        context['fields'] = self._get_fields()
+        return context
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
-        if self.action == 'list':
+        if self.action in self.SPARSE_ACTIONS and self._get_fields():
+            # requested fields are picked from all the detail fields
+            return serializers.RecipeDetailSerialzer
+        elif self.action == 'list':
             return serializers.RecipeSerializer
         # upload_image is a custom action. Viewset provides built-in actions
         # such as list, delete, update
@@ -92,18 +431,137 @@ class RecipeViewset(viewsets.ModelViewSet):
     # define custom action - detail=True specify this is applied to
     # specific object. detail=False would apply action to the list
     # endpoint
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'async',
+                OpenApiTypes.BOOL,
+                description='Queue processing of the image and return '
+                            'job to poll instead of waiting for it.',
+            ),
+        ],
+        responses={
+            200: serializers.RecipeImageSerializer,
+            202: serializers.ImageJobSerializer,
+        },
+    )
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to recipe."""
+        # stream upload to temporary file, rejecting invalid images early.
+        # must be set before request data are parsed
+        upload_handler = ImageUploadHandler(request)
+        request.upload_handlers = [upload_handler]
         recipe = self.get_object()
-        serializer = self.get_serializer(recipe, data=request.data)
+        data = request.data
+        if upload_handler.error:
+            return Response(
+                {'image': [upload_handler.error]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if request.query_params.get('async') in ('1', 'true'):
+            return self._queue_image(request, recipe, data)
 
+        serializer = self.get_serializer(recipe, data=data)
         if serializer.is_valid():
-            serializer.save()
+            # variants of previous image are not valid anymore
+            recipe = serializer.save(image_variants={})
+            images.schedule_variants(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _queue_image(self, request, recipe, data):
+        """Queue processing of uploaded image, return job to poll."""
+        # image is decoded and variants are generated by worker
+        # (process_image_jobs command), API worker is free meanwhile
+        serializer = serializers.ImageJobSerializer(
+            data=data, context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(recipe=recipe)
+        status_url = request.build_absolute_uri(
+            reverse('recipe:imagejob-detail', args=[job.id])
+        )
+
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': status_url},
+        )
+
+    @extend_schema(
+        request=serializers.RecipeDetailSerialzer(many=True),
+        responses={201: OpenApiTypes.OBJECT},
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk',
+            parser_classes=[JSONParser, NDJSONParser])
+    def bulk_import(self, request):
+        """Create many recipes from JSON array or NDJSON body."""
+        serializer = serializers.RecipeDetailSerialzer(
+            data=request.data,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        created = bulk.import_recipes(request.user, serializer.validated_data)
+
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('tags', OpenApiTypes.STR),
+            OpenApiParameter('ingredients', OpenApiTypes.STR),
+            OpenApiParameter('match', OpenApiTypes.STR, enum=['any', 'all']),
+        ],
+        responses={200: serializers.RecipeStatsSerializer},
+    )
+    @action(methods=['GET'], detail=False, url_path='stats')
+    def stats(self, request):
+        """Return statistics of recipes filtered like the list."""
+        def get_data():
+            # aggregated in SQL, recipes are never loaded
+            return serializers.RecipeStatsSerializer(
+                stats.get_recipe_stats(self._get_filtered_queryset()),
+            ).data
+
+        if not settings.RECIPE_CACHE:
+            return Response(get_data())
+
+        key = cache.get_list_key(request, 'recipe-stats')
+
+        def get_response():
+            data = cache.get_data(key)
+            if data is None:
+                data = get_data()
+                cache.set_data(key, data)
+            return Response(data)
+
+        # cached until the user writes, like the lists
+        return conditional_response(
+            request,
+            etag=cache.get_etag(key),
+            last_modified=cache.get_last_modified(request.user.id),
+            get_response=get_response,
+        )
+
+    @extend_schema(responses={200: serializers.RecipeDetailSerialzer})
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream recipes as NDJSON."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.read_database is not None:
+            # rows are read while streaming, after replica routing of the
+            # request ended. Prefetches follow database of the recipes
+            queryset = queryset.using(self.read_database)
+        return StreamingHttpResponse(
+            bulk.export_recipes(
+                queryset, serializers.RecipeDetailSerialzer,
+                self._get_prefetches(),
+            ),
+            content_type=NDJSONParser.media_type,
+        )
+
 
 # mixins must be defined before GenericViewSet, because it overrides some
 #  behavior
@@ -114,17 +572,107 @@ class RecipeViewset(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes.',
-            )
+            ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include number of recipes using each item '
+                            '(recipe_count).',
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR, enum=filters.ORDER_CHOICES,
+                description='Order by name (default) or by number of '
+                            'recipes, most used first.',
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Autocomplete - return items with name '
+                            'starting with or similar to the text, best '
+                            'matches first.',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of autocompleted items.',
+            ),
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            CachedListMixin,
+                            FastListMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrPagination
+
+    def list(self, request, *args, **kwargs):
+        """Return user's objects, autocompleted when q is given."""
+        text = request.query_params.get('q')
+        if text is None:
+            return super().list(request, *args, **kwargs)
+
+        return self._autocomplete(request, text.strip())
+
+    def _autocomplete(self, request, text):
+        """Return the best matches of text, cached in process."""
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.AUTOCOMPLETE_LIMIT,
+            ))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+        if not text:
+            return Response([])
+
+        def get_data():
+            return self.get_serializer(
+                autocomplete.complete_names(self.get_queryset(), text, limit),
+                many=True,
+            ).data
+
+        if not settings.AUTOCOMPLETE_CACHE:
+            return Response(get_data())
+
+        key = autocomplete.get_key(
+            self.basename,
+            request.user.id,
+            text,
+            limit,
+            request.query_params.get('assigned_only', '0'),
+            self._with_counts(),
+        )
+        data = autocomplete.get_data(key)
+        if data is None:
+            data = get_data()
+            autocomplete.set_data(key, data)
+
+        return Response(data)
+
+    def _with_counts(self):
+        """Return whether recipe counts of items are requested."""
+        return bool(int(self.request.query_params.get('with_counts', 0)))
+
+    def get_list_rows(self, queryset):
+        """Return values() rows of listed objects."""
+        return fastpath.get_attr_rows(queryset, self._with_counts())
+
+    def serialize_rows(self, rows):
+        """Return rows, they are in serializer format already."""
+        return list(rows)
+
+    def get_serializer_context(self):
+        """Pass whether to serialize recipe counts."""
+        context = super().get_serializer_context()
+        context['with_counts'] = self._with_counts()
+        return context
 
     # override behavior - by default we return all tags of database.
     # want to return all tags but only for the user
@@ -136,14 +684,21 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        ordering = self.request.query_params.get(
+            'ordering', filters.ORDER_NAME,
+        )
+        if ordering not in filters.ORDER_CHOICES:
+            choices = ', '.join(filters.ORDER_CHOICES)
+            raise ValidationError({'ordering': f'Must be one of: {choices}.'})
+
+        queryset = self.queryset.filter(user=self.request.user)
+        if self._with_counts() or ordering == filters.ORDER_POPULAR:
+            queryset = filters.annotate_recipe_count(queryset)
         if assigned_only:
             # set only tags/ingredients which have assigned recipe field
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filters.filter_assigned(queryset)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.order_by(*filters.ATTR_ORDERINGS[ordering])
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -156,3 +711,15 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+class ImageJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """View for polling status of queued image uploads."""
+    serializer_class = serializers.ImageJobSerializer
+    queryset = ImageJob.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve jobs of authenticated user's recipes."""
+        return self.queryset.filter(recipe__user=self.request.user)
@@ -0,0 +1,23 @@
+server {
+    listen ${LISTEN_PORT};
+
+    # uploaded images are named by hash of their content and never change
+    location /static/media/uploads/ {
+        alias /vol/static/media/uploads/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    location /static {
+        alias /vol/static;
+    }
+
+    # app served by ASGI server speaks HTTP, not uwsgi protocol
+    location / {
+        proxy_pass            http://${APP_HOST}:${APP_PORT};
+        proxy_http_version    1.1;
+        proxy_set_header      Host $host;
+        proxy_set_header      X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header      X-Forwarded-Proto $scheme;
+        client_max_body_size  10M;
+    }
+}
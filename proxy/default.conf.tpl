@@ -1,6 +1,12 @@
 server {
     listen ${LISTEN_PORT};
 
+    # uploaded images are named by hash of their content and never change
+    location /static/media/uploads/ {
+        alias /vol/static/media/uploads/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location /static {
         alias /vol/static;
     }
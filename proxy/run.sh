@@ -4,6 +4,12 @@ set -e
 
 # environment subsitute
 # replace any environment variables calls in conf.tpl and output it into default.conf NGINX
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+# APP_SERVER=asgi proxies to app over HTTP instead of uwsgi protocol
+TEMPLATE=/etc/nginx/default.conf.tpl
+if [ "$APP_SERVER" = "asgi" ]; then
+    TEMPLATE=/etc/nginx/default.asgi.conf.tpl
+fi
+# only listed variables are replaced, nginx variables like $host are kept
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' < $TEMPLATE > /etc/nginx/conf.d/default.conf
 # starts nginx with default.conf in the foreground - all logs would be outputted on the screen into docker
 nginx -g 'daemon off;'
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/bin/sh
+
+# Capacity of the container, sourced by run.sh.
+# Reads cgroup (v2 or v1) limits, falls back to the host's resources.
+
+# number of CPUs available to the container, rounded up
+cpu_count() {
+    cpus=$(nproc 2>/dev/null || echo 1)
+    quota=""
+    period=""
+    if [ -r /sys/fs/cgroup/cpu.max ]; then
+        # cgroup v2: "<quota> <period>", quota is "max" when unlimited
+        read -r quota period < /sys/fs/cgroup/cpu.max
+    elif [ -r /sys/fs/cgroup/cpu/cpu.cfs_quota_us ]; then
+        # cgroup v1: quota is -1 when unlimited
+        quota=$(cat /sys/fs/cgroup/cpu/cpu.cfs_quota_us)
+        period=$(cat /sys/fs/cgroup/cpu/cpu.cfs_period_us)
+    fi
+    if [ -n "$quota" ] && [ "$quota" != "max" ] && [ "$quota" -gt 0 ]; then
+        limit=$(( (quota + period - 1) / period ))
+        if [ "$limit" -lt "$cpus" ]; then
+            cpus=$limit
+        fi
+    fi
+    echo "$cpus"
+}
+
+# memory available to the container in MB
+memory_mb() {
+    limit=""
+    if [ -r /sys/fs/cgroup/memory.max ]; then
+        limit=$(cat /sys/fs/cgroup/memory.max)
+    elif [ -r /sys/fs/cgroup/memory/memory.limit_in_bytes ]; then
+        limit=$(cat /sys/fs/cgroup/memory/memory.limit_in_bytes)
+    fi
+    host=$(awk '/^MemTotal:/ { print int($2 / 1024) }' /proc/meminfo)
+    # v2 reports "max", v1 a huge number when unlimited
+    if [ -z "$limit" ] || [ "$limit" = "max" ]; then
+        echo "$host"
+        return
+    fi
+    limit=$(( limit / 1024 / 1024 ))
+    if [ "$limit" -lt "$host" ]; then
+        echo "$limit"
+    else
+        echo "$host"
+    fi
+}
+
+# max length of listen queue allowed by kernel
+somaxconn() {
+    cat /proc/sys/net/core/somaxconn 2>/dev/null || echo 128
+}
+
+# number of workers: 2 per CPU + 1, as long as they fit in memory
+uwsgi_workers() {
+    workers=$(( $(cpu_count) * 2 + 1 ))
+    # memory left after the master process, per worker
+    memory=$(( $(memory_mb) - ${UWSGI_MASTER_MEMORY_MB:-64} ))
+    fit=$(( memory / ${UWSGI_WORKER_MEMORY_MB:-128} ))
+    if [ "$fit" -lt "$workers" ]; then
+        workers=$fit
+    fi
+    if [ "$workers" -lt 1 ]; then
+        workers=1
+    fi
+    echo "$workers"
+}
+
+# number of threads of every worker: workers * threads serve
+# UWSGI_REQUESTS_PER_CPU concurrent requests per CPU (requests mostly wait
+# for database and storage), containers limited by memory to fewer
+# workers get more threads, at most UWSGI_MAX_THREADS
+uwsgi_threads() {
+    workers=$1
+    target=$(( $(cpu_count) * ${UWSGI_REQUESTS_PER_CPU:-4} ))
+    threads=$(( (target + workers - 1) / workers ))
+    if [ "$threads" -gt "${UWSGI_MAX_THREADS:-8}" ]; then
+        threads=${UWSGI_MAX_THREADS:-8}
+    fi
+    if [ "$threads" -lt 1 ]; then
+        threads=1
+    fi
+    echo "$threads"
+}
@@ -3,10 +3,76 @@
 # force failing script if any commands would fail in this script
 set -e
 
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+# derives capacity from container limits
+. "$(dirname "$0")/capacity.sh"
+
+# startup time is reported by the app when loaded (app.wsgi)
+STARTUP_BEGIN=$(python -c 'import time; print(time.time())')
+export STARTUP_BEGIN
+
+# static files are collected at image build (/static-build), they are
+# copied to the volume shared with proxy only when the image changed
+if [ -f /static-build.id ]; then
+    if ! cmp -s /static-build.id /vol/web/static/.build-id; then
+        cp -R /static-build/. /vol/web/static/
+        cp /static-build.id /vol/web/static/.build-id
+    fi
+else
+    python manage.py collectstatic --noinput
+fi
+
+# MIGRATE_ON_START=0 leaves migrations to a separate release step,
+# otherwise replicas take turns under an advisory lock and only the
+# first one applies them
+if [ "${MIGRATE_ON_START:-1}" = "1" ]; then
+    python manage.py migrate_once
+else
+    python manage.py wait_for_db
+fi
+
+# APP_SERVER=asgi serves the app by uvicorn (app.asgi), hot read endpoints
+# by async views. Proxy has to run with the same APP_SERVER.
+if [ "$APP_SERVER" = "asgi" ]; then
+    # one event loop per worker serves many requests at once
+    exec uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-$(cpu_count)}" --proxy-headers
+fi
 
 # run uwsgi service - port 9000 is used by proxy to connect app server
-# workers numbers should be related to cpu capabilities
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# workers follow CPUs and memory of the container, every UWSGI_* variable
+# overrides the derived value
+WORKERS=${UWSGI_WORKERS:-$(uwsgi_workers)}
+THREADS=${UWSGI_THREADS:-$(uwsgi_threads "$WORKERS")}
+# queue of connections waiting for a worker, kernel caps it by somaxconn
+LISTEN=${UWSGI_LISTEN:-$(somaxconn)}
+if [ "$LISTEN" -gt "$(somaxconn)" ]; then
+    LISTEN=$(somaxconn)
+fi
+
+# lazy apps load the app in every worker after fork, which allows
+# reloading workers one by one (touch /tmp/uwsgi-reload), by default the
+# app is preloaded in master and workers share its memory
+if [ "${UWSGI_LAZY_APPS:-0}" = "1" ]; then
+    set -- --lazy-apps --touch-chain-reload /tmp/uwsgi-reload
+else
+    set -- --touch-reload /tmp/uwsgi-reload
+fi
+
+# stats server (JSON over HTTP) listens on all interfaces of the container,
+# reachable by monitoring on the compose network, port is not published
+STATS=${UWSGI_STATS:-:9191}
+
+echo "uWSGI: $WORKERS workers, $THREADS threads, listen queue $LISTEN" \
+    "($(cpu_count) CPUs, $(memory_mb) MB)"
+
+exec uwsgi --socket :9000 --module app.wsgi --master --enable-threads \
+    --workers "$WORKERS" \
+    --threads "$THREADS" \
+    --listen "$LISTEN" \
+    --harakiri "${UWSGI_HARAKIRI:-30}" \
+    --max-requests "${UWSGI_MAX_REQUESTS:-5000}" \
+    --reload-on-rss "${UWSGI_WORKER_MEMORY_MB:-128}" \
+    --stats "$STATS" --stats-http \
+    --die-on-term \
+    --vacuum \
+    "$@"